@@ -0,0 +1,183 @@
+"""
+Read-through account profile cache for FraudGuard AI
+A bounded LRU of accounts rows in front of SQLite so /predict can fill in
+account age, trust score and past-fraud flags server-side: a hit is a
+dict lookup, a miss is one primary-key query, and unknown accounts are
+cached too so they do not hit SQLite on every request.
+
+Writes made through this cache invalidate it immediately; writes made by
+other workers are picked up by polling the accounts revision column
+(indexed) at most once per SYNC_INTERVAL_S, on a background thread once
+follow() has been called in the worker.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import database as db
+from table_follower import Follower
+
+MAX_ENTRIES = int(os.getenv("FRAUDGUARD_ACCOUNT_CACHE_SIZE", "100000"))
+SYNC_INTERVAL_S = float(os.getenv("FRAUDGUARD_ACCOUNT_CACHE_SYNC_S", "1.0"))
+
+_MISSING = object()  # cached "no such account"
+
+
+def _age_years(created_at, now):
+    try:
+        created = datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+    return max((now - created).total_seconds(), 0) / (365.25 * 86400)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class AccountCache:
+    """Bounded LRU of account profiles, read-through and write-through"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, sync_interval=SYNC_INTERVAL_S):
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._revision = None
+        self._last_sync = float("-inf")
+        self._follower = Follower(self.sync, sync_interval, "account-cache-sync", "ACCOUNTS")
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------
+    # Reads
+    # ------------------------------
+    def get(self, account_id, cached_only=False):
+        """
+        Account row as a dict, or None for an unknown account. With
+        cached_only a miss returns None instead of querying SQLite.
+        """
+        self._maybe_sync()
+        # Hit path without the lock: get/move_to_end are single C calls under the GIL
+        row = self._entries.get(account_id)
+        if row is not None:
+            try:
+                self._entries.move_to_end(account_id)
+            except KeyError:  # evicted or invalidated meanwhile; the row is still valid to return
+                pass
+            self.hits += 1
+            return None if row is _MISSING else row
+        self.misses += 1
+        if cached_only:
+            return None
+        row = db.get_account(account_id)
+        self._store(account_id, row)
+        return row
+
+    def prefetch(self, account_ids):
+        """Load every uncached id in one batched query (for batch scoring); returns {id: row}"""
+        self._maybe_sync()
+        result, missing = {}, []
+        with self._lock:
+            for account_id in dict.fromkeys(a for a in account_ids if a):
+                row = self._entries.get(account_id)
+                if row is None:
+                    missing.append(account_id)
+                elif row is not _MISSING:
+                    self._entries.move_to_end(account_id)
+                    result[account_id] = row
+        self.hits += len(result)
+        if missing:
+            self.misses += len(missing)
+            found = db.get_accounts(missing)
+            for account_id in missing:
+                self._store(account_id, found.get(account_id))
+            result.update(found)
+        return result
+
+    def _store(self, account_id, row):
+        with self._lock:
+            self._entries[account_id] = _MISSING if row is None else row
+            self._entries.move_to_end(account_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ------------------------------
+    # Writes and invalidation
+    # ------------------------------
+    def upsert(self, account_id, **fields):
+        """Write the account to SQLite and drop the cached copy"""
+        ok = db.create_or_update_account(account_id, **fields)
+        self.invalidate(account_id)
+        return ok
+
+    def invalidate(self, account_id):
+        with self._lock:
+            self._entries.pop(account_id, None)
+
+    def _maybe_sync(self):
+        if self._follower.running:
+            return  # the follower thread syncs
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def follow(self):
+        """Sync every sync_interval on this worker's follower thread from now on"""
+        self._follower.start()
+        return self
+
+    def sync(self):
+        """Drop accounts that any process has written since the last sync"""
+        self._last_sync = time.monotonic()
+        if self._revision is None:
+            self._revision = db.query("SELECT COALESCE(MAX(revision), 0) AS r FROM accounts", one=True)["r"]
+            with self._lock:
+                self._entries.clear()
+            return 0
+        changed = db.get_account_revisions(self._revision)
+        if changed:
+            with self._lock:
+                for r in changed:
+                    self._entries.pop(r["account_id"], None)
+            self._revision = changed[-1]["revision"]
+        return len(changed)
+
+    # ------------------------------
+    # Scorer features
+    # ------------------------------
+    def fill_missing(self, data, account_id=None, now=None, cached_only=False):
+        """
+        Add account_age (years), social_trust_score and past_fraudulent_behavior
+        from the sender's profile wherever the payload left them out.
+        cached_only skips senders that are not already cached.
+        """
+        account_id = account_id or data.get("from_account")
+        profile = self.get(account_id, cached_only=cached_only) if account_id else None
+        if profile is None:
+            return data
+        if data.get("account_age") is None and profile.get("created_at"):
+            age = _age_years(profile["created_at"], now or datetime.utcnow())
+            if age is not None:
+                data["account_age"] = round(age, 3)
+        for field in ("social_trust_score", "past_fraudulent_behavior"):
+            # Rows written before PUT /accounts validated types may hold text
+            if data.get(field) is None and _is_number(profile.get(field)):
+                data[field] = profile[field]
+        return data
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+            "revision": self._revision,
+        }
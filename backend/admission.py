@@ -0,0 +1,207 @@
+"""
+Admission control for FraudGuard AI
+Bounds concurrent work, sheds load with a fast 503 once the wait queue is
+full, and flips into a degraded (rule-only) mode when the p99 latency of
+the full scoring path exceeds its budget.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+MAX_IN_FLIGHT = int(os.getenv("FRAUDGUARD_MAX_IN_FLIGHT", "16"))
+MAX_QUEUE = int(os.getenv("FRAUDGUARD_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT_MS = float(os.getenv("FRAUDGUARD_QUEUE_TIMEOUT_MS", "250"))
+DEADLINE_MS = float(os.getenv("FRAUDGUARD_DEADLINE_MS", "2000"))
+P99_BUDGET_MS = float(os.getenv("FRAUDGUARD_P99_BUDGET_MS", "500"))
+P99_WINDOW_S = float(os.getenv("FRAUDGUARD_P99_WINDOW_S", "30"))
+
+MODE_NORMAL = "normal"
+MODE_DEGRADED = "degraded"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    An admitted request: holds a concurrency slot and carries its deadline
+    (app.admit() caps the request's SQLite lock waits at what is left of it)
+    """
+
+    def __init__(self, controller, started, deadline):
+        self._controller = controller
+        self.started = started
+        self.deadline = deadline
+        self.full_path = False
+
+    def remaining(self):
+        """Seconds left before the deadline (negative once expired)"""
+        return self.deadline - time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._controller._release(self)
+        return False
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limiter with a bounded wait queue.
+
+    At most `max_in_flight` requests run at once and at most `max_queue`
+    more may wait up to `queue_timeout_ms` for a slot; anything beyond
+    that is shed immediately. Latencies of requests that took the full
+    path (model + persistence) over the last `window_s` seconds decide
+    the mode by their p99. While degraded, one request in `probe_every`
+    still takes the full path so recovery can be observed; the window is
+    emptied on entering degraded mode so only those probes count.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE,
+                 queue_timeout_ms=QUEUE_TIMEOUT_MS, deadline_ms=DEADLINE_MS,
+                 p99_budget_ms=P99_BUDGET_MS, window=512, window_s=P99_WINDOW_S,
+                 min_samples=50, min_probe_samples=10, recovery_ratio=0.8,
+                 min_degraded_s=10.0, probe_every=20):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.deadline = deadline_ms / 1000.0
+        self.p99_budget = p99_budget_ms / 1000.0
+        self.window_s = window_s
+        self.min_samples = min_samples
+        self.min_probe_samples = min_probe_samples
+        self.recovery_ratio = recovery_ratio
+        self.min_degraded_s = min_degraded_s
+        self.probe_every = probe_every
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)  # (monotonic time, seconds)
+        self._since_check = 0
+        self._p99 = 0.0
+        self._degraded_since = None
+        self._probe_counter = 0
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_queue_timeout = 0
+        self.deadline_exceeded = 0
+        self.degraded_served = 0
+        self.mode_changes = 0
+
+    # ------------------------------
+    # Admission
+    # ------------------------------
+    def admit(self):
+        """Return a Ticket, or raise Overloaded without blocking when the queue is full"""
+        started = time.monotonic()
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                raise Overloaded("queue full")
+            self.waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.shed_queue_timeout += 1
+                raise Overloaded("queue timeout")
+            self.in_flight += 1
+            self.admitted += 1
+        return Ticket(self, started, started + self.deadline)
+
+    def _release(self, ticket):
+        elapsed = time.monotonic() - ticket.started
+        with self._lock:
+            self.in_flight -= 1
+            if elapsed > self.deadline:
+                self.deadline_exceeded += 1
+            if ticket.full_path:
+                self._record(elapsed)
+        self._slots.release()
+
+    # ------------------------------
+    # Mode selection
+    # ------------------------------
+    @property
+    def mode(self):
+        return MODE_DEGRADED if self._degraded_since is not None else MODE_NORMAL
+
+    def use_full_path(self, ticket):
+        """
+        Decide whether this request may run the model and persistence.
+        Marks the ticket so only full-path latencies feed the p99 window.
+        """
+        with self._lock:
+            if self._degraded_since is not None:
+                self._probe_counter += 1
+                if self._probe_counter % self.probe_every:
+                    self.degraded_served += 1
+                    return False
+        ticket.full_path = True
+        return True
+
+    def _record(self, elapsed, now=None):
+        # Called with self._lock held. In normal mode the p99 is recomputed
+        # every 16 samples so the sort stays off most requests; while
+        # degraded only probes arrive, so every one of them is checked
+        now = time.monotonic() if now is None else now
+        self._latencies.append((now, elapsed))
+        while self._latencies[0][0] < now - self.window_s:
+            self._latencies.popleft()
+        degraded = self._degraded_since is not None
+        self._since_check += 1
+        needed = self.min_probe_samples if degraded else self.min_samples
+        if (not degraded and self._since_check < 16) or len(self._latencies) < needed:
+            return
+        self._since_check = 0
+
+        ordered = sorted(latency for _, latency in self._latencies)
+        self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        if not degraded:
+            if self._p99 > self.p99_budget:
+                self._degraded_since = now
+                self._latencies.clear()  # recovery is judged on probes alone
+                self.mode_changes += 1
+                print(f"[ADMISSION] Degraded: p99 {self._p99 * 1000:.0f} ms > budget {self.p99_budget * 1000:.0f} ms")
+        elif (self._p99 < self.p99_budget * self.recovery_ratio
+              and now - self._degraded_since >= self.min_degraded_s):
+            self._degraded_since = None
+            self.mode_changes += 1
+            print(f"[ADMISSION] Recovered: p99 {self._p99 * 1000:.0f} ms")
+
+    # ------------------------------
+    # Metrics
+    # ------------------------------
+    def snapshot(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "shed": self.shed_queue_full + self.shed_queue_timeout,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_queue_timeout": self.shed_queue_timeout,
+                "deadline_exceeded": self.deadline_exceeded,
+                "degraded_served": self.degraded_served,
+                "mode_changes": self.mode_changes,
+                "p99_ms": round(self._p99 * 1000, 2),
+                "p99_budget_ms": round(self.p99_budget * 1000, 2),
+                "p99_window_s": self.window_s,
+            }
@@ -1,8 +1,19 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 import database as db
+import model_service
+import admission
+import shadow_scoring
+import drift_monitor
+import static_assets
+import fraud_rings
+import velocity
+import account_cache
+import ingest_log
+import profiler
+from fraud_detector import detect_fraud
+import gc
 from datetime import datetime
-import random
 import os
 
 # ==============================
@@ -10,13 +21,76 @@ import os
 # ==============================
 app = Flask(
     __name__,
-    static_folder="static/dist",  # Serve built React files from here
-    static_url_path=""
+    static_folder=None  # Built React files are served from memory by serve_frontend
 )
 
 # ✅ Enable CORS for development (remove for production if serving frontend from Flask)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# Shared by every endpoint that can pile up behind SQLite or the model
+admission_controller = admission.AdmissionController()
+
+# Candidate models are scored in the background, never on the request path
+shadow_scorer = shadow_scoring.ShadowScorer()
+
+# Per-feature streaming sketches; /drift reads them, never the transactions table
+drift = drift_monitor.DriftMonitor()
+
+# Connected components of the account graph, followed from the transactions table
+ring_index = fraud_rings.FraudRingIndex()
+
+# Sender profiles (age, trust, past fraud) for server-side feature fill-in
+accounts = account_cache.AccountCache()
+
+# Windowed distinct-count sketches (recipients per sender, accounts per device)
+velocity_index = velocity.VelocityIndex()
+
+def catch_up_indexes(count=None):
+    """Fold freshly written transactions into the in-memory indexes"""
+    ring_index.catch_up()
+    velocity_index.catch_up()
+
+def rebuild_indexes():
+    """Start the in-memory indexes over after a delete (neither can remove a row)"""
+    ring_index.rebuild()
+    velocity_index.rebuild()
+
+# /save_transaction appends here; a background applier batches rows into SQLite
+ingest = ingest_log.IngestLog(on_applied=catch_up_indexes)
+
+@app.before_request
+def check_model_version():
+    # Picks up a newly promoted model artifact between requests
+    model_service.maybe_reload()
+
+@app.before_request
+def start_followers():
+    # Per-worker threads keep the indexes and account cache in step with
+    # SQLite, so lookups on the request path stay in memory (no-op once running)
+    ring_index.follow()
+    velocity_index.follow()
+    accounts.follow()
+
+# Opt-in (FRAUDGUARD_SLOW_REQUEST_MS): stacks and SQL timings of slow requests;
+# when unset no hooks are installed
+slow_requests = profiler.SlowRequestRecorder().install(app) if profiler.SLOW_REQUEST_MS > 0 else None
+
+def admit():
+    """Admission ticket for this request; its SQLite lock waits end at the ticket's deadline"""
+    ticket = admission_controller.admit()
+    db.set_busy_timeout(ticket.remaining())
+    return ticket
+
+@app.teardown_request
+def reset_busy_timeout(exc):
+    db.set_busy_timeout(None)
+
+def overloaded_response(e):
+    """Fast 503 for shed requests"""
+    response = jsonify({"error": "Service overloaded, retry shortly", "reason": e.reason})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
 # ==============================
 # 🩺 Health Check
 # ==============================
@@ -26,9 +100,64 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "database": "connected" if db.test_connection() else "unavailable",
-        "service": "FraudGuard AI Backend"
+        "service": "FraudGuard AI Backend",
+        "mode": admission_controller.mode,
+        "model_version": model_service.current_version()
     }), 200
 
+@app.route("/shadow", methods=["GET"])
+def shadow_stats():
+    """Candidate-vs-served agreement counters and queue drops"""
+    return jsonify(shadow_scorer.snapshot()), 200
+
+def drift_hours(default):
+    """?hours= as an int within the sketch retention, or None when it is not"""
+    try:
+        hours = int(request.args.get("hours", default))
+    except ValueError:
+        return None
+    return hours if 1 <= hours <= drift.retention_hours else None
+
+def drift_hours_error():
+    return jsonify({"error": f"hours must be an integer from 1 to {drift.retention_hours}"}), 400
+
+@app.route("/drift", methods=["GET"])
+def drift_report():
+    """Feature drift of recent traffic against the baseline (PSI / KS)"""
+    hours = drift_hours(1)
+    if hours is None:
+        return drift_hours_error()
+    return jsonify(drift.report(hours)), 200
+
+@app.route("/drift/baseline", methods=["POST"])
+def drift_set_baseline():
+    """Promote the last N hours of sketches to the drift baseline"""
+    hours = drift_hours(24)
+    if hours is None:
+        return drift_hours_error()
+    count = drift.set_baseline(hours)
+    return jsonify({"success": True, "baseline_count": count, "hours": hours}), 200
+
+@app.route("/velocity", methods=["GET"])
+def velocity_stats():
+    """Key count and memory of the distinct-count sketches in this worker"""
+    return jsonify(velocity_index.stats()), 200
+
+@app.route("/account_cache", methods=["GET"])
+def account_cache_stats():
+    """Hit rate and size of this worker's account profile cache"""
+    return jsonify(accounts.stats()), 200
+
+@app.route("/ingest", methods=["GET"])
+def ingest_stats():
+    """Append/apply counters of this worker's ingest log"""
+    return jsonify(ingest.stats()), 200
+
+@app.route("/admission", methods=["GET"])
+def admission_stats():
+    """Current mode, queue depth and shed counters (for alerting)"""
+    return jsonify(admission_controller.snapshot()), 200
+
 # ==============================
 # 🧠 Fraud Prediction Logic
 # ==============================
@@ -36,36 +165,104 @@ def health_check():
 def predict():
     data = request.get_json() or {}
     try:
-        amount = float(data.get("transaction_amount", 0))
-        vpn_flag = int(data.get("vpn_proxy_usage", 0))
-        blacklist_flag = int(data.get("recipient_blacklist_status", 0))
-        suspicious_verif = str(data.get("recipient_verification_status", "")).lower() == "suspicious"
-
-        # Simple heuristic
-        is_fraud = amount > 5000 or vpn_flag == 1 or blacklist_flag == 1 or suspicious_verif
-
-        if is_fraud:
-            probability = round(random.uniform(0.75, 0.99), 2)
-            fraud_score = round(random.uniform(7.0, 10.0), 1)
-            prediction = "Fraudulent"
-        else:
-            probability = round(random.uniform(0.0, 0.3), 2)
-            fraud_score = round(random.uniform(1.0, 3.5), 1)
-            prediction = "Legitimate"
+        ticket = admit()
+    except admission.Overloaded as e:
+        return overloaded_response(e)
+
+    with ticket:
+        try:
+            # Degraded mode serves the rule score alone from in-memory state:
+            # decided before any lookup can hit SQLite
+            full_path = admission_controller.use_full_path(ticket)
+            features = accounts.fill_missing(dict(data), cached_only=not full_path)
+            features.update(ring_index.scorer_features(data.get("to_account")))
+            features.update(velocity_index.scorer_features(data.get("from_account"), data.get("device_id")))
+            result = detect_fraud(features)
+            drift.record(data)
+
+            if full_path:
+                shadow_scorer.submit(
+                    data.get("id"),
+                    model_service.build_feature_vector(features),
+                    result["probability"],
+                    result["prediction"]
+                )
+                result["mode"] = admission.MODE_NORMAL
+            else:
+                result["mode"] = admission.MODE_DEGRADED
+
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+@app.route("/explain", methods=["POST"])
+def explain():
+    """RandomForest probability for a /predict payload with its top TreeSHAP factors"""
+    data = request.get_json() or {}
+    try:
+        top_k = int(request.args.get("top_k", 3))
+    except ValueError:
+        return jsonify({"error": "top_k must be an integer"}), 400
+    try:
+        ticket = admit()
+    except admission.Overloaded as e:
+        return overloaded_response(e)
+
+    with ticket:
+        # Explanations are optional work: shed them first
+        if not admission_controller.use_full_path(ticket):
+            return overloaded_response(admission.Overloaded("degraded mode"))
+        features = accounts.fill_missing(dict(data))
+        result = model_service.explain(features, top_k=max(1, min(top_k, len(model_service.FEATURE_NAMES))))
+        if result is None:
+            return jsonify({"error": "No explainable model loaded"}), 503
+        result["model_version"] = model_service.current_version()
+        return jsonify(result), 200
+
+# ==============================
+# 🔬 Admin: Profiling
+# ==============================
+def admin_denied():
+    """404 while no admin token is configured (the surface does not exist), else 401"""
+    if not profiler.ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"error": "Unauthorized"}), 401
 
+@app.route("/admin/profile", methods=["GET"])
+def admin_profile():
+    """Sample every thread of this worker for N seconds (at most MAX_PROFILE_SECONDS); collapsed stacks by default"""
+    if not profiler.authorized(request):
+        return admin_denied()
+    try:
+        seconds = float(request.args.get("seconds", 5))
+        interval = float(request.args.get("interval_ms", profiler.SAMPLE_INTERVAL_S * 1000)) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    if seconds <= 0 or interval <= 0:
+        return jsonify({"error": "seconds and interval_ms must be positive"}), 400
+    seconds = min(seconds, profiler.MAX_PROFILE_SECONDS)
+    try:
+        stacks, rounds = profiler.sample(seconds, max(interval, 0.001))
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    if request.args.get("format") == "json":
         return jsonify({
-            "prediction": prediction,
-            "probability": probability,
-            "fraud_score": fraud_score,
-            "risk_factors": list(filter(None, [
-                "High transaction amount" if amount > 5000 else "",
-                "VPN usage detected" if vpn_flag else "",
-                "Recipient blacklisted" if blacklist_flag else "",
-                "Suspicious verification" if suspicious_verif else ""
-            ]))
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+            "pid": os.getpid(),
+            "seconds": seconds,
+            "rounds": rounds,
+            "stacks": [{"stack": s, "count": c} for s, c in stacks.most_common()]
+        }), 200
+    return profiler.format_collapsed(stacks), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.route("/admin/slow_requests", methods=["GET"])
+def admin_slow_requests():
+    """Recently captured slow requests of this worker, newest last"""
+    if not profiler.authorized(request):
+        return admin_denied()
+    if slow_requests is None:
+        return jsonify({"enabled": False, "records": []}), 200
+    return jsonify(dict(slow_requests.snapshot(), enabled=True, pid=os.getpid())), 200
 
 # ==============================
 # 💾 Database Operations
@@ -73,28 +270,58 @@ def predict():
 @app.route("/save_transaction", methods=["POST"])
 def save_transaction_endpoint():
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
+        ticket = admit()
+    except admission.Overloaded as e:
+        return overloaded_response(e)
 
-        if "id" not in data:
-            data["id"] = f"txn-{int(datetime.now().timestamp() * 1000)}"
+    with ticket:
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"error": "No data provided"}), 400
+            # Reject what SQLite cannot store now, not in the background applier
+            try:
+                data = db.normalize_transaction(data)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
 
-        success = db.save_transaction(data)
-        if success:
-            return jsonify({
-                "success": True,
-                "message": "Transaction saved successfully",
-                "transaction_id": data["id"]
-            }), 200
-        else:
-            return jsonify({
-                "success": False,
-                "message": "Failed to save transaction (duplicate or DB error)"
-            }), 400
-    except Exception as e:
-        print(f"[ERROR] save_transaction: {e}")
-        return jsonify({"error": str(e)}), 500
+            if "id" not in data:
+                data["id"] = db.new_transaction_id(data.get("from_account"))
+            # Stamped at acceptance, not when the log is applied (or replayed)
+            if not data.get("timestamp"):
+                data["timestamp"] = datetime.utcnow().isoformat()
+
+            # A log append costs microseconds and never waits on SQLite: it is
+            # not shed, and stays out of the full-path p99
+            if ingest_log.ENABLED:
+                ingest.append(data)
+                return jsonify({
+                    "success": True,
+                    "message": "Transaction accepted",
+                    "transaction_id": data["id"],
+                    "queued": True
+                }), 200
+
+            # A synchronous SQLite write is what degraded mode sheds; the client keeps its local copy
+            if not admission_controller.use_full_path(ticket):
+                return overloaded_response(admission.Overloaded("degraded mode"))
+
+            success = db.save_transaction(data)
+            if success:
+                catch_up_indexes()
+                return jsonify({
+                    "success": True,
+                    "message": "Transaction saved successfully",
+                    "transaction_id": data["id"]
+                }), 200
+            else:
+                return jsonify({
+                    "success": False,
+                    "message": "Failed to save transaction (duplicate or DB error)"
+                }), 400
+        except Exception as e:
+            print(f"[ERROR] save_transaction: {e}")
+            return jsonify({"error": str(e)}), 500
 
 @app.route("/transactions", methods=["GET"])
 def get_transactions_endpoint():
@@ -104,13 +331,15 @@ def get_transactions_endpoint():
         prediction = request.args.get('prediction')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        account_id = request.args.get('account_id')
 
         transactions = db.get_transactions(
             prediction_filter=prediction,
             start_date=start_date,
             end_date=end_date,
             limit=limit,
-            offset=offset
+            offset=offset,
+            account_id=account_id
         )
 
         return jsonify(transactions), 200
@@ -143,6 +372,8 @@ def get_stats_endpoint():
 def delete_transaction_endpoint(transaction_id):
     try:
         success = db.delete_transaction(transaction_id)
+        if success:
+            rebuild_indexes()
         return jsonify({
             "success": success,
             "message": "Deleted" if success else "Not found"
@@ -155,6 +386,8 @@ def delete_transaction_endpoint(transaction_id):
 def delete_all_transactions_endpoint():
     try:
         count = db.delete_all_transactions()
+        if count:
+            rebuild_indexes()
         return jsonify({
             "success": True,
             "deleted_count": count
@@ -163,6 +396,71 @@ def delete_all_transactions_endpoint():
         print(f"[ERROR] delete_all_transactions: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/accounts/<account_id>/transactions", methods=["GET"])
+def get_account_transactions_endpoint(account_id):
+    """Keyset-paginated history: pass the returned next_cursor back as ?cursor="""
+    try:
+        role = request.args.get('role', 'both')
+        if role not in db.ACCOUNT_ROLES:
+            return jsonify({"error": f"role must be one of {sorted(db.ACCOUNT_ROLES)}"}), 400
+        try:
+            limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        cursor = request.args.get('cursor')
+
+        page = db.get_account_transactions(account_id, role=role, cursor=cursor, limit=limit)
+        return jsonify(page), 200
+    except Exception as e:
+        print(f"[ERROR] get_account_transactions: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/accounts/<account_id>/summary", methods=["GET"])
+def get_account_summary_endpoint(account_id):
+    try:
+        role = request.args.get('role', 'both')
+        if role not in db.ACCOUNT_ROLES:
+            return jsonify({"error": f"role must be one of {sorted(db.ACCOUNT_ROLES)}"}), 400
+
+        summary = db.get_account_summary(
+            account_id,
+            role=role,
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date')
+        )
+        return jsonify(summary), 200
+    except Exception as e:
+        print(f"[ERROR] get_account_summary: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/accounts/<account_id>", methods=["GET"])
+def get_account_endpoint(account_id):
+    """Stored profile of one account (served from the account cache)"""
+    profile = accounts.get(account_id)
+    if profile is None:
+        return jsonify({"error": "Account not found"}), 404
+    return jsonify(profile), 200
+
+@app.route("/accounts/<account_id>", methods=["PUT"])
+def put_account_endpoint(account_id):
+    """Create or update an account; omitted fields keep their stored values"""
+    data = request.get_json()
+    try:
+        fields = db.normalize_account({} if data is None else data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not accounts.upsert(account_id, **fields):
+        return jsonify({"error": "Failed to save account"}), 500
+    return jsonify(accounts.get(account_id)), 200
+
+@app.route("/rings/<account_id>", methods=["GET"])
+def get_ring_endpoint(account_id):
+    """Size, fraud rate and volume of the account's connected cluster"""
+    component = ring_index.component(account_id)
+    if component is None:
+        return jsonify({"error": "Account not found"}), 404
+    return jsonify(dict(component, account_id=account_id)), 200
+
 @app.route("/get_transactions", methods=["GET"])
 def get_transactions_alias():
     """Alias for frontend compatibility"""
@@ -171,14 +469,14 @@ def get_transactions_alias():
 # ==============================
 # 🌐 Serve React Frontend
 # ==============================
+asset_manifest = static_assets.AssetManifest(os.path.join(app.root_path, "static/dist"))
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_frontend(path):
-    dist_dir = os.path.join(app.root_path, "static/dist")
-    if path != "" and os.path.exists(os.path.join(dist_dir, path)):
-        return send_from_directory(dist_dir, path)
-    else:
-        return send_from_directory(dist_dir, "index.html")
+    # Unknown paths fall back to index.html for client-side routing
+    asset = asset_manifest.get(path) or asset_manifest.get("index.html")
+    return asset_manifest.respond(asset, request)
 
 # ==============================
 # 🚦 Global Error Handler
@@ -188,10 +486,45 @@ def handle_exception(e):
     print(f"🔥 Backend Error: {e}")
     return jsonify({"error": str(e)}), 500
 
+# ==============================
+# 🏗️ Application Startup
+# ==============================
+_started = False
+
+def create_app():
+    """
+    Run the one-time startup phase and return the app.
+    Under gunicorn with preload_app this executes once in the master:
+    the schema DDL runs a single time, and the read-only model and static
+    asset manifest are loaded and GC-frozen before fork so workers share
+    their pages copy-on-write.
+    """
+    global _started
+    if not _started:
+        db.init_db()
+        # Apply whatever the previous run appended but never reached SQLite
+        ingest_log.recover()
+        ring_index.start()
+        velocity_index.start()
+        # Workers open their own SQLite connections after the fork
+        db.close_db()
+        if model_service.load_model() is not None:
+            shadow_scorer.register_candidate("random_forest", model_service.predict_proba_batch)
+            # TreeSHAP tables are read-only too: build them before fork
+            model_service.get_explainer()
+        asset_manifest.load()
+        # Park everything allocated so far in the permanent generation;
+        # otherwise each worker's first full collection writes to every
+        # object header and un-shares the pages
+        gc.collect()
+        gc.freeze()
+        _started = True
+    return app
+
 # ==============================
 # 🚀 Run Server
 # ==============================
 if __name__ == "__main__":
     print("🚀 Starting FraudGuard AI Backend Server...")
     print("✅ Serving static files from: static/dist")
-    app.run(host="0.0.0.0", port=8080)
+    create_app().run(host="0.0.0.0", port=8080)
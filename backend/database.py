@@ -2,20 +2,194 @@ import sqlite3
 from datetime import datetime
 import os
 import json
+import math
+import threading
+import time
+import heapq
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "fraudguard.db")
+# >1 splits transactions across fraudguard.shard-<n>.db files by hash of from_account;
+# accounts stay in DB_PATH
+SHARDS = int(os.getenv("FRAUDGUARD_DB_SHARDS", "0"))
 
 
 
+# ==============================
+# ⏱️ Query Timing (opt-in)
+# ==============================
+# observer(sql, seconds, executed), set by the profiler; plain sqlite3 connections when None
+_query_observer = None
+
+class _TimedCursor(sqlite3.Cursor):
+    """Reports execute plus fetch time per statement (SQLite steps lazily)"""
+
+    def _report(self, start, executed=False):
+        _query_observer(self._sql, time.perf_counter() - start, executed)
+
+    def execute(self, sql, params=()):
+        self._sql, start = sql, time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._report(start, executed=True)
+
+    def executemany(self, sql, seq_of_params):
+        self._sql, start = sql, time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._report(start, executed=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._report(start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._report(start)
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+def set_query_observer(observer):
+    """
+    Time every statement through observer(sql, seconds, executed), where
+    executed is False for the fetches that follow an execute. Each thread
+    reopens its connection on next use; None restores plain connections.
+    """
+    global _query_observer
+    _query_observer = observer
+
 # ==============================
 # 🧱 Database Initialization
 # ==============================
-def connect_db():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+_local = threading.local()
+BUSY_TIMEOUT_MS = 5000  # sqlite3.connect's default wait on a locked database
 
-def init_db():
-    with connect_db() as conn:
+def set_busy_timeout(seconds):
+    """
+    Cap how long this thread's statements wait on a locked database
+    (requests pass what is left of their deadline); None restores
+    BUSY_TIMEOUT_MS. Applied to each connection on its next use.
+    """
+    _local.busy_timeout_ms = BUSY_TIMEOUT_MS if seconds is None else max(0, int(seconds * 1000))
+
+def connect_db(shard=None):
+    """
+    Return this thread's connection to the main database (or to one
+    transactions shard), opening it lazily. Connections are keyed by pid
+    so a forked worker never reuses the master's file handle; it opens
+    its own on first use after the fork.
+    """
+    path = DB_PATH if shard is None else shard_path(shard)
+    key = (os.getpid(), path, _query_observer is not None)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None or conn[0] != key:
+        factory = _TimedConnection if _query_observer is not None else sqlite3.Connection
+        # [key, connection, busy timeout (ms) currently set on it]
+        conn = [key, sqlite3.connect(path, check_same_thread=False, factory=factory), BUSY_TIMEOUT_MS]
+        conn[1].row_factory = sqlite3.Row
+        conns[path] = conn
+    busy_timeout_ms = getattr(_local, "busy_timeout_ms", BUSY_TIMEOUT_MS)
+    if conn[2] != busy_timeout_ms:
+        conn[1].execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+        conn[2] = busy_timeout_ms
+    return conn[1]
+
+def close_db():
+    """Close this thread's connections (called before forking workers)"""
+    for _, conn, _ in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+# ==============================
+# 🧩 Transaction Shards
+# ==============================
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_write_locks = {}
+
+def shard_path(shard):
+    root, ext = os.path.splitext(DB_PATH)
+    return f"{root}.shard-{shard}{ext}"
+
+def transaction_shards():
+    """Where transactions live: shard numbers, or [None] for the single database"""
+    return list(range(SHARDS)) if SHARDS > 1 else [None]
+
+def shard_for(from_account):
+    if SHARDS <= 1:
+        return None
+    return zlib.crc32(str(from_account or "").encode("utf-8")) % SHARDS
+
+_SHARD_TAG = re.compile(r"-s(\d+)$")
+
+def new_transaction_id(from_account=None):
+    """
+    Server-generated id, txn-<ms>-<random hex>; the random part keeps saves
+    in the same millisecond (from any worker) from overwriting each other.
+    In sharded mode it ends in -s<shard> so lookups skip the fan-out.
+    """
+    txn_id = f"txn-{int(datetime.now().timestamp() * 1000)}-{os.urandom(4).hex()}"
+    shard = shard_for(from_account)
+    return txn_id if shard is None else f"{txn_id}-s{shard}"
+
+def shard_of_id(transaction_id):
+    """Shard named by an id's tag, or None (untagged ids are looked up everywhere)"""
+    match = _SHARD_TAG.search(str(transaction_id or ""))
+    if match and SHARDS > 1 and int(match.group(1)) < SHARDS:
+        return int(match.group(1))
+    return None
+
+def _write_lock(shard):
+    # One writer per shard file in this process; other processes queue on SQLite's lock
+    lock = _write_locks.get(shard)
+    if lock is None:
+        lock = _write_locks.setdefault(shard, threading.Lock())
+    return lock
+
+def fan_out(fn, shards=None):
+    """fn(shard) for every transactions shard, in parallel when there are several"""
+    shards = transaction_shards() if shards is None else shards
+    if len(shards) <= 1:
+        return [fn(shard) for shard in shards]
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        # Pool threads do not survive fork: each worker builds its own
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=max(SHARDS, 2), thread_name_prefix="db-shard")
+                _pool_pid = os.getpid()
+    return list(_pool.map(fn, shards))
+
+def _newest_first(results, limit=None, offset=0):
+    """k-way merge of per-shard lists already sorted newest first"""
+    merged = list(heapq.merge(*results, key=lambda r: (r["timestamp"] or "", r["id"]), reverse=True))
+    return merged[offset:] if limit is None else merged[offset:offset + limit]
+
+def _init_transactions(shard):
+    with connect_db(shard) as conn:
         c = conn.cursor()
         c.execute("""
         CREATE TABLE IF NOT EXISTS transactions (
@@ -37,86 +211,307 @@ def init_db():
             time_since_last_transaction REAL,
             social_trust_score REAL,
             account_age REAL,
-            risk_factors TEXT
+            risk_factors TEXT,
+            device_id TEXT
+        )
+        """)
+        # Databases created before device_id existed
+        columns = {r["name"] for r in c.execute("PRAGMA table_info(transactions)")}
+        if "device_id" not in columns:
+            c.execute("ALTER TABLE transactions ADD COLUMN device_id TEXT")
+        # Covering indexes for account-scoped history and summaries:
+        # (account, timestamp, id) gives keyset order, the trailing columns
+        # let the aggregates run without touching the table
+        c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_from_account
+            ON transactions (from_account, timestamp, id, transaction_amount, prediction, to_account)
+        """)
+        c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_to_account
+            ON transactions (to_account, timestamp, id, transaction_amount, prediction)
+        """)
+        # Bumped by every delete: rowids can be reused after one, so the
+        # in-memory indexes that follow this table by rowid start over
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS transactions_epoch (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            epoch INTEGER NOT NULL
         )
         """)
+        c.execute("INSERT OR IGNORE INTO transactions_epoch (id, epoch) VALUES (0, 0)")
+        conn.commit()
+
+def init_db():
+    for shard in transaction_shards():
+        _init_transactions(shard)
+    with connect_db() as conn:
+        c = conn.cursor()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            account_id TEXT PRIMARY KEY,
+            email TEXT,
+            name TEXT,
+            created_at TEXT,
+            social_trust_score REAL,
+            past_fraudulent_behavior INTEGER DEFAULT 0,
+            updated_at TEXT,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        # Account caches in other workers poll for revisions past their watermark
+        c.execute("CREATE INDEX IF NOT EXISTS idx_accounts_revision ON accounts (revision)")
         conn.commit()
 
-init_db()
 # ==============================
 # 💾 Save Transaction
 # ==============================
+TRANSACTION_COLUMNS = (
+    "id", "from_account", "to_account", "transaction_amount",
+    "prediction", "probability", "fraud_score", "timestamp",
+    "transaction_frequency", "recipient_verification_status",
+    "recipient_blacklist_status", "device_fingerprinting",
+    "vpn_proxy_usage", "geo_location_flags", "behavioral_biometrics",
+    "time_since_last_transaction", "social_trust_score", "account_age", "risk_factors",
+    "device_id",
+)
+
+# Upsert rather than INSERT OR REPLACE: re-saving an id (client retry,
+# ingest replay) updates the row in place and keeps its rowid, so the
+# indexes that follow the table by rowid do not count it twice
+INSERT_TRANSACTION_SQL = f"""
+    INSERT INTO transactions ({", ".join(TRANSACTION_COLUMNS)})
+    VALUES ({", ".join("?" * len(TRANSACTION_COLUMNS))})
+    ON CONFLICT(id) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in TRANSACTION_COLUMNS[1:])}
+"""
+
+# Column affinities for normalize_transaction (everything else is TEXT)
+_REAL_COLUMNS = {"transaction_amount", "probability", "fraud_score", "behavioral_biometrics",
+                 "time_since_last_transaction", "social_trust_score", "account_age"}
+_INTEGER_COLUMNS = {"transaction_frequency", "recipient_blacklist_status", "device_fingerprinting",
+                    "vpn_proxy_usage", "past_fraudulent_behavior"}
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        value = int(value)
+    if column in _REAL_COLUMNS or column in _INTEGER_COLUMNS:
+        try:
+            number = float(value) if isinstance(value, (int, float, str)) else None
+        except ValueError:
+            number = None
+        if number is not None and math.isfinite(number):
+            if column in _REAL_COLUMNS:
+                return number
+            if number.is_integer():
+                return int(number)
+    elif isinstance(value, (str, int, float)):
+        return str(value)
+    raise ValueError(f"{column} has an unsupported value: {value!r}")
+
+def normalize_transaction(data):
+    """
+    Copy of a transaction payload with every stored column coerced to its
+    column type (numbers from numeric strings, text from scalars); other
+    keys pass through. Raises ValueError for values SQLite cannot bind.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("transaction must be a JSON object")
+    clean = dict(data)
+    for column in TRANSACTION_COLUMNS:
+        if column == "risk_factors":
+            factors = data.get(column)
+            if factors is None:
+                continue
+            if isinstance(factors, str):
+                factors = [factors]
+            if not isinstance(factors, list) or not all(isinstance(f, (str, int, float)) for f in factors):
+                raise ValueError(f"risk_factors must be a list of strings: {factors!r}")
+            clean[column] = [str(f) for f in factors]
+        elif column in data:
+            clean[column] = _coerce(column, data[column])
+    return clean
+
+def _transaction_params(data):
+    return (
+        data.get("id"),
+        data.get("from_account"),
+        data.get("to_account"),
+        data.get("transaction_amount"),
+        data.get("prediction"),
+        data.get("probability"),
+        data.get("fraud_score"),
+        data.get("timestamp") or datetime.utcnow().isoformat(),
+        data.get("transaction_frequency"),
+        data.get("recipient_verification_status"),
+        data.get("recipient_blacklist_status"),
+        data.get("device_fingerprinting"),
+        data.get("vpn_proxy_usage"),
+        data.get("geo_location_flags"),
+        data.get("behavioral_biometrics"),
+        data.get("time_since_last_transaction"),
+        data.get("social_trust_score"),
+        data.get("account_age"),
+        json.dumps(data.get("risk_factors", [])),
+        data.get("device_id")
+    )
+
 def save_transaction(data):
-    """Insert or replace a transaction safely into the database"""
+    """Insert or replace a transaction safely into the database (its sender's shard)"""
+    shard = shard_for(data.get("from_account"))
     try:
-        with connect_db() as conn:
+        with _write_lock(shard), connect_db(shard) as conn:
             c = conn.cursor()
+            c.execute(INSERT_TRANSACTION_SQL, _transaction_params(data))
+            conn.commit()
+            print("[DB] Transaction saved successfully.")
+            return True
+    except Exception as e:
+        print("[DB ERROR]", e)
+        return False
 
-            c.execute("""
-                INSERT OR REPLACE INTO transactions (
-                    id, from_account, to_account, transaction_amount,
-                    prediction, probability, fraud_score, timestamp,
-                    transaction_frequency, recipient_verification_status,
-                    recipient_blacklist_status, device_fingerprinting,
-                    vpn_proxy_usage, geo_location_flags, behavioral_biometrics,
-                    time_since_last_transaction, social_trust_score, account_age, risk_factors
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data.get("id"),
-                data.get("from_account"),
-                data.get("to_account"),
-                data.get("transaction_amount"),
-                data.get("prediction"),
-                data.get("probability"),
-                data.get("fraud_score"),
-                data.get("timestamp"),
-                data.get("transaction_frequency"),
-                data.get("recipient_verification_status"),
-                data.get("recipient_blacklist_status"),
-                data.get("device_fingerprinting"),
-                data.get("vpn_proxy_usage"),
-                data.get("geo_location_flags"),
-                data.get("behavioral_biometrics"),
-                data.get("time_since_last_transaction"),
-                data.get("social_trust_score"),
-                data.get("account_age"),
-                json.dumps(data.get("risk_factors", []))
-            ))
+def save_transactions(batch):
+    """
+    Insert or replace many transactions, one SQLite transaction per shard
+    (shards are written in parallel); returns the count written
+    """
+    by_shard = {}
+    for d in batch:
+        by_shard.setdefault(shard_for(d.get("from_account")), []).append(_transaction_params(d))
 
+    def write(shard):
+        with _write_lock(shard), connect_db(shard) as conn:
+            conn.executemany(INSERT_TRANSACTION_SQL, by_shard[shard])
             conn.commit()
-            print("[DB] Transaction saved successfully.")
+
+    fan_out(write, list(by_shard))
+    return len(batch)
+
+# ==============================
+# 👤 Accounts
+# ==============================
+ACCOUNT_FIELDS = ("email", "name", "created_at", "social_trust_score", "past_fraudulent_behavior")
+ACCOUNT_LOOKUP_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+def normalize_account(data):
+    """
+    ACCOUNT_FIELDS of an account payload, coerced like normalize_transaction
+    (the scorer reads trust score and past fraud as numbers). Raises
+    ValueError for anything that would break scoring later.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("account must be a JSON object")
+    clean = {field: _coerce(field, data[field]) for field in ACCOUNT_FIELDS if field in data}
+    if clean.get("created_at") is not None:
+        try:
+            datetime.fromisoformat(clean["created_at"].replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"created_at is not an ISO 8601 timestamp: {clean['created_at']!r}")
+    return clean
+
+def create_or_update_account(account_id, email=None, name=None, created_at=None,
+                             social_trust_score=None, past_fraudulent_behavior=None):
+    """
+    Insert an account or update the fields that are given (None keeps the
+    stored value). Every write bumps the table-wide revision so caches can
+    tell which accounts changed.
+    """
+    now = datetime.utcnow().isoformat()
+    values = (email, name, created_at or now, social_trust_score, past_fraudulent_behavior)
+    try:
+        with connect_db() as conn:
+            conn.execute(f"""
+                INSERT INTO accounts (account_id, {", ".join(ACCOUNT_FIELDS)}, updated_at, revision)
+                VALUES (?, ?, ?, ?, ?, COALESCE(?, 0), ?,
+                        (SELECT COALESCE(MAX(revision), 0) + 1 FROM accounts))
+                ON CONFLICT(account_id) DO UPDATE SET
+                    email = COALESCE(?, email),
+                    name = COALESCE(?, name),
+                    created_at = COALESCE(?, created_at),
+                    social_trust_score = COALESCE(?, social_trust_score),
+                    past_fraudulent_behavior = COALESCE(?, past_fraudulent_behavior),
+                    updated_at = excluded.updated_at,
+                    revision = excluded.revision
+            """, (account_id, *values, now, email, name, created_at, social_trust_score,
+                  past_fraudulent_behavior))
+            conn.commit()
+            print("[DB] Account saved successfully.")
             return True
     except Exception as e:
         print("[DB ERROR]", e)
         return False
 
+def get_account(account_id):
+    """One account profile by primary key, or None"""
+    return query("SELECT * FROM accounts WHERE account_id = ?", (account_id,), one=True)
+
+def get_accounts(account_ids):
+    """Profiles for many accounts as {account_id: row}; unknown ids are absent"""
+    ids = list(dict.fromkeys(account_ids))
+    found = {}
+    for start in range(0, len(ids), ACCOUNT_LOOKUP_CHUNK):
+        chunk = ids[start:start + ACCOUNT_LOOKUP_CHUNK]
+        rows = query(f"SELECT * FROM accounts WHERE account_id IN ({','.join('?' * len(chunk))})", chunk)
+        found.update((r["account_id"], r) for r in rows)
+    return found
+
+def get_account_revisions(since):
+    """(account_id, revision) of accounts written after revision `since`, oldest first"""
+    return query("SELECT account_id, revision FROM accounts WHERE revision > ? ORDER BY revision", (since,))
+
 # ==============================
 # 🧠 Utility Functions
 # ==============================
-def query(sql, params=(), one=False):
-    with connect_db() as conn:
-        conn.row_factory = sqlite3.Row
+def query(sql, params=(), one=False, shard=None):
+    with connect_db(shard) as conn:
         cur = conn.cursor()
         cur.execute(sql, params)
         rv = cur.fetchall()
         return (dict(rv[0]) if rv else None) if one else [dict(r) for r in rv]
 
-def execute(sql, params=()):
-    with connect_db() as conn:
+def test_connection():
+    """Cheap liveness probe used by /health"""
+    try:
+        connect_db().execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+def execute(sql, params=(), shard=None):
+    with connect_db(shard) as conn:
         cur = conn.cursor()
         cur.execute(sql, params)
         conn.commit()
         return cur.rowcount
+
+def query_transactions(sql, params=(), limit=None, offset=0, shards=None):
+    """
+    Run a newest-first transactions query on the given shards (default:
+    all) and k-way merge the results. The SQL must end in
+    "ORDER BY timestamp DESC, id DESC"; with a limit it must also end in
+    "LIMIT ?", which each shard gets as offset + limit.
+    """
+    if limit is not None:
+        params = list(params) + [limit + offset]
+    results = fan_out(lambda shard: query(sql, params, shard=shard), shards)
+    return _newest_first(results, limit, offset)
 # ==============================
 # 📦 Get Transactions (with filters)
 # ==============================
-def get_transactions(prediction_filter=None, start_date=None, end_date=None, limit=100, offset=0):
+def get_transactions(prediction_filter=None, start_date=None, end_date=None, limit=100, offset=0,
+                     account_id=None):
     """
-    Retrieve transactions with optional filters (prediction type, date range, pagination).
+    Retrieve transactions with optional filters (prediction type, date range, pagination,
+    account as sender or recipient).
     """
     sql = "SELECT * FROM transactions WHERE 1=1"
     params = []
 
+    if account_id:
+        sql += " AND (from_account = ? OR to_account = ?)"
+        params.extend([account_id, account_id])
+
     if prediction_filter:
         sql += " AND prediction = ?"
         params.append(prediction_filter)
@@ -129,41 +524,198 @@ def get_transactions(prediction_filter=None, start_date=None, end_date=None, lim
         sql += " AND timestamp <= ?"
         params.append(end_date)
 
+    if SHARDS > 1:
+        return query_transactions(sql + " ORDER BY timestamp DESC, id DESC LIMIT ?", params, limit, offset)
+
     sql += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
     params.extend([limit, offset])
 
     with connect_db() as conn:
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
         cur.execute(sql, params)
         rows = cur.fetchall()
         return [dict(row) for row in rows]
+
+# ==============================
+# 👤 Account-scoped History
+# ==============================
+ACCOUNT_ROLES = {
+    "sender": ("from_account",),
+    "recipient": ("to_account",),
+    "both": ("from_account", "to_account"),
+}
+
+def _account_shards(account_id, role):
+    # Rows live in their sender's shard; received transactions can be anywhere
+    return [shard_for(account_id)] if role == "sender" else transaction_shards()
+
+def encode_cursor(row):
+    # An empty timestamp field stands for NULL (rows saved without one)
+    return f"{row['timestamp'] or ''}|{row['id']}"
+
+def decode_cursor(cursor):
+    timestamp, _, txn_id = cursor.partition("|")
+    return timestamp or None, txn_id
+
+def get_account_transactions(account_id, role="both", cursor=None, limit=50):
+    """
+    Newest-first history of one account using keyset pagination.
+    Each role is a range scan on its (account, timestamp, id) index, so
+    a page costs the same whether it is the first or the ten-thousandth.
+    Returns {"transactions": [...], "next_cursor": str or None}.
+    """
+    columns = ACCOUNT_ROLES[role]
+    limit = max(1, int(limit))  # a page must hold the row the next cursor is taken from
+    parts, params = [], []
+    for column in columns:
+        part = f"SELECT * FROM transactions WHERE {column} = ?"
+        params.append(account_id)
+        if cursor:
+            timestamp, txn_id = decode_cursor(cursor)
+            if timestamp is None:
+                # Undated rows sort last (NULL is lowest); page through them by id
+                part += " AND timestamp IS NULL AND id < ?"
+                params.append(txn_id)
+            else:
+                part += " AND ((timestamp, id) < (?, ?) OR timestamp IS NULL)"
+                params.extend([timestamp, txn_id])
+        part += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        parts.append(f"SELECT * FROM ({part})")
+
+    # UNION (not UNION ALL) so a self-transfer appears once
+    sql = " UNION ".join(parts) + " ORDER BY timestamp DESC, id DESC LIMIT ?"
+
+    rows = query_transactions(sql, params, limit, shards=_account_shards(account_id, role))
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return {"transactions": rows, "next_cursor": next_cursor}
+
+def get_account_summary(account_id, role="both", start_date=None, end_date=None):
+    """
+    Count, total amount and fraud rate for one account, answered from the
+    covering indexes alone. For "both", self-transfers are counted once.
+    """
+    def aggregate(where, params):
+        sql = f"""
+            SELECT COUNT(*) AS count,
+                   COALESCE(SUM(transaction_amount), 0) AS total_amount,
+                   COALESCE(SUM(prediction = 'Fraudulent'), 0) AS frauds
+            FROM transactions WHERE {where}
+        """
+        if start_date:
+            sql += " AND timestamp >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND timestamp <= ?"
+            params.append(end_date)
+        parts = fan_out(lambda shard: query(sql, params, one=True, shard=shard), shards)
+        return {key: sum(p[key] for p in parts) for key in parts[0]}
+
+    shards = _account_shards(account_id, role)
+
+    totals = {"count": 0, "total_amount": 0.0, "frauds": 0}
+    for column in ACCOUNT_ROLES[role]:
+        part = aggregate(f"{column} = ?", [account_id])
+        for key in totals:
+            totals[key] += part[key]
+    if role == "both":
+        overlap = aggregate("from_account = ? AND to_account = ?", [account_id, account_id])
+        for key in totals:
+            totals[key] -= overlap[key]
+
+    count = totals["count"]
+    return {
+        "account_id": account_id,
+        "role": role,
+        "count": count,
+        "total_amount": round(totals["total_amount"], 2),
+        "frauds": totals["frauds"],
+        "fraud_rate": round(totals["frauds"] / count, 4) if count else 0,
+    }
+
+def _by_id(fn, transaction_id):
+    """
+    fn(shard) on the shard named by the id's tag; untagged ids (and the
+    rare client id that only looks tagged) fall back to every other shard.
+    """
+    owner = shard_of_id(transaction_id)
+    if owner is not None:
+        result = fn(owner)
+        if result:
+            return result
+    others = [shard for shard in transaction_shards() if owner is None or shard != owner]
+    return next((r for r in fan_out(fn, others) if r), None) if others else None
+
 def get_transaction_by_id(transaction_id):
     """Fetch one transaction by ID"""
-    return query("SELECT * FROM transactions WHERE id = ?", (transaction_id,), one=True)
+    return _by_id(lambda shard: query("SELECT * FROM transactions WHERE id = ?", (transaction_id,),
+                                      one=True, shard=shard), transaction_id)
 
 # ==============================
 # 📊 Core DB Operations
 # ==============================
 def get_all_transactions(limit=10):
-    return query("SELECT * FROM transactions ORDER BY timestamp DESC LIMIT ?", (limit,))
+    return query_transactions("SELECT * FROM transactions ORDER BY timestamp DESC, id DESC LIMIT ?",
+                              limit=limit)
 
 def get_transaction_stats():
-    total = query("SELECT COUNT(*) as c FROM transactions", one=True)["c"]
-    frauds = query("SELECT COUNT(*) as c FROM transactions WHERE prediction='Fraudulent'", one=True)["c"]
+    parts = fan_out(lambda shard: query(
+        "SELECT COUNT(*) AS c, COALESCE(SUM(prediction = 'Fraudulent'), 0) AS f FROM transactions",
+        one=True, shard=shard))
+    total = sum(p["c"] for p in parts)
+    frauds = sum(p["f"] for p in parts)
     legitimate = total - frauds
     accuracy = round((legitimate / total) * 100, 2) if total > 0 else 0
     return {"total": total, "frauds": frauds, "legitimate": legitimate, "accuracy": accuracy}
 
+def _delete(sql, params=(), shard=None):
+    # Row count of the delete; the epoch moves in the same SQLite transaction
+    with _write_lock(shard), connect_db(shard) as conn:
+        count = conn.execute(sql, params).rowcount
+        if count:
+            conn.execute("UPDATE transactions_epoch SET epoch = epoch + 1")
+        conn.commit()
+        return count
+
 def delete_transaction(transaction_id):
-    return execute("DELETE FROM transactions WHERE id=?", (transaction_id,))
+    return _by_id(lambda shard: _delete("DELETE FROM transactions WHERE id=?", (transaction_id,), shard),
+                  transaction_id) or 0
 
 def delete_all_transactions():
-    return execute("DELETE FROM transactions")
+    return sum(fan_out(lambda shard: _delete("DELETE FROM transactions", shard=shard)))
+
+def delete_epochs():
+    """{shard: number of deletes so far}; a change means rowids may have been reused"""
+    return {shard: query("SELECT epoch FROM transactions_epoch", one=True, shard=shard)["epoch"]
+            for shard in transaction_shards()}
 
 
 def search_by_prediction(prediction):
-    return query("SELECT * FROM transactions WHERE prediction=? ORDER BY timestamp DESC", (prediction,))
+    return query_transactions(
+        "SELECT * FROM transactions WHERE prediction=? ORDER BY timestamp DESC, id DESC", (prediction,))
+
+def reshard(source_path, batch_size=5000):
+    """
+    Copy every transaction of a single-file database into the configured
+    shards (run once when turning FRAUDGUARD_DB_SHARDS on); returns rows copied.
+    """
+    source = sqlite3.connect(source_path)
+    source.row_factory = sqlite3.Row
+    copied = 0
+    try:
+        cur = source.execute("SELECT * FROM transactions ORDER BY rowid")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = [dict(r) for r in rows]
+            for row in batch:
+                # stored as JSON text; _transaction_params encodes it again
+                row["risk_factors"] = json.loads(row["risk_factors"] or "[]")
+            copied += save_transactions(batch)
+    finally:
+        source.close()
+    return copied
 
 # ==============================
 # 🧩 Mini Text GUI
@@ -230,5 +782,12 @@ def main_menu():
 # 🚀 Run GUI
 # ==============================
 if __name__ == "__main__":
+    import sys
     init_db()
-    main_menu()
+    if len(sys.argv) == 3 and sys.argv[1] == "reshard":
+        if SHARDS <= 1:
+            print("❌ Set FRAUDGUARD_DB_SHARDS to the shard count first")
+            sys.exit(1)
+        print(f"✅ Copied {reshard(sys.argv[2])} transactions into {SHARDS} shards")
+    else:
+        main_menu()
@@ -0,0 +1,453 @@
+"""
+Streaming feature-drift monitor for FraudGuard AI
+Every prediction updates a fixed-size sketch per feature: a KLL quantile
+sketch for numeric fields and a capped counter for categorical ones.
+Sketches are mergeable, so per-worker hourly snapshots on disk combine
+into one view that /drift compares against a baseline with PSI and KS,
+without scanning the transactions table.
+"""
+
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DRIFT_DIR = os.getenv("FRAUDGUARD_DRIFT_DIR", os.path.join(BASE_DIR, "drift"))
+FLUSH_INTERVAL_S = float(os.getenv("FRAUDGUARD_DRIFT_FLUSH_S", "60"))
+RETENTION_HOURS = int(os.getenv("FRAUDGUARD_DRIFT_RETENTION_HOURS", "168"))
+
+# (field, default) pairs; defaults mirror fraud_detector.detect_fraud
+NUMERIC_FEATURES = [
+    ("transaction_amount", 0), ("transaction_frequency", 0), ("behavioral_biometrics", 0),
+    ("time_since_last_transaction", 0), ("social_trust_score", 50), ("account_age", 1),
+    ("normalized_transaction_amount", 0), ("transaction_context_anomalies", 0),
+    ("fraud_complaints_count", 0),
+]
+CATEGORICAL_FEATURES = [
+    ("recipient_verification_status", "verified"), ("geo_location_flags", "normal"),
+    ("recipient_blacklist_status", 0), ("device_fingerprinting", 0), ("vpn_proxy_usage", 0),
+    ("high_risk_transaction_times", 0), ("past_fraudulent_behavior", 0),
+    ("location_inconsistent", 0), ("merchant_category_mismatch", 0),
+    ("user_daily_limit_exceeded", 0), ("recent_high_value_flags", 0),
+]
+
+PSI_BINS = 10
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+
+
+# ==============================
+# 📐 KLL Quantile Sketch
+# ==============================
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty). Keeps O(k) items in a
+    stack of compactors; level h items carry weight 2**h. Rank error is
+    about 1.7/k with high probability.
+    """
+
+    def __init__(self, k=200, c=2.0 / 3.0):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = 0
+        self._update_max_size()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            if len(self.compactors[h]) >= self._capacity(h):
+                if h + 1 >= len(self.compactors):
+                    self.compactors.append([])
+                    self._update_max_size()
+                items = sorted(self.compactors[h])
+                # An odd leftover stays at this level so no weight is lost
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = random.getrandbits(1)
+                self.compactors[h + 1].extend(items[offset::2])
+                self.compactors[h] = keep
+                self.size = sum(len(level) for level in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, level in enumerate(other.compactors):
+            self.compactors[h].extend(level)
+        self.n += other.n
+        self._update_max_size()
+        self.size = sum(len(level) for level in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+            self._update_max_size()
+        return self
+
+    def _weighted(self):
+        items = sorted((v, 1 << h) for h, level in enumerate(self.compactors) for v in level)
+        return items, sum(w for _, w in items)
+
+    def cdf(self, points):
+        """Fraction of the stream <= each point (points must be sorted ascending)"""
+        items, total = self._weighted()
+        if not total:
+            return [0.0] * len(points)
+        result, cumulative, i = [], 0, 0
+        for p in points:
+            while i < len(items) and items[i][0] <= p:
+                cumulative += items[i][1]
+                i += 1
+            result.append(cumulative / total)
+        return result
+
+    def quantiles(self, fractions):
+        """Approximate values at each fraction in [0, 1] (ascending)"""
+        items, total = self._weighted()
+        if not total:
+            return [None] * len(fractions)
+        result, cumulative, i = [], 0, 0
+        for q in fractions:
+            target = q * total
+            while i < len(items) - 1 and cumulative + items[i][1] <= target:
+                cumulative += items[i][1]
+                i += 1
+            result.append(items[i][0])
+        return result
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(k=d["k"])
+        sketch.n = d["n"]
+        sketch.compactors = [list(level) for level in d["compactors"]] or [[]]
+        sketch.size = sum(len(level) for level in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+
+# ==============================
+# 🔢 Capped Category Counter
+# ==============================
+class CategoryCounter:
+    """Counts per category; values past `max_categories` fold into '__other__'"""
+
+    OTHER = "__other__"
+
+    def __init__(self, max_categories=64):
+        self.max_categories = max_categories
+        self.counts = {}
+        self.n = 0
+
+    def update(self, value):
+        key = str(value)
+        if key not in self.counts and len(self.counts) >= self.max_categories:
+            key = self.OTHER
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.n += 1
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            if key not in self.counts and len(self.counts) >= self.max_categories:
+                key = self.OTHER
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.n += other.n
+        return self
+
+    def to_dict(self):
+        return {"max_categories": self.max_categories, "n": self.n, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, d):
+        counter = cls(max_categories=d["max_categories"])
+        counter.n = d["n"]
+        counter.counts = dict(d["counts"])
+        return counter
+
+
+# ==============================
+# 🧺 Per-feature Sketch Set
+# ==============================
+class FeatureSketches:
+    """One sketch per monitored feature"""
+
+    def __init__(self):
+        self.numeric = {name: KLLSketch() for name, _ in NUMERIC_FEATURES}
+        self.categorical = {name: CategoryCounter() for name, _ in CATEGORICAL_FEATURES}
+
+    def update(self, data):
+        for name, default in NUMERIC_FEATURES:
+            try:
+                self.numeric[name].update(float(data.get(name, default)))
+            except (TypeError, ValueError):
+                pass
+        for name, default in CATEGORICAL_FEATURES:
+            self.categorical[name].update(data.get(name, default))
+
+    def merge(self, other):
+        for name, sketch in other.numeric.items():
+            self.numeric[name].merge(sketch)
+        for name, counter in other.categorical.items():
+            self.categorical[name].merge(counter)
+        return self
+
+    @property
+    def n(self):
+        return self.numeric[NUMERIC_FEATURES[0][0]].n
+
+    def to_dict(self):
+        return {
+            "numeric": {name: s.to_dict() for name, s in self.numeric.items()},
+            "categorical": {name: c.to_dict() for name, c in self.categorical.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketches = cls()
+        for name, sd in d.get("numeric", {}).items():
+            if name in sketches.numeric:
+                sketches.numeric[name] = KLLSketch.from_dict(sd)
+        for name, cd in d.get("categorical", {}).items():
+            if name in sketches.categorical:
+                sketches.categorical[name] = CategoryCounter.from_dict(cd)
+        return sketches
+
+
+# ==============================
+# 📊 Drift Statistics
+# ==============================
+def _psi(expected, actual):
+    eps = 1e-4
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, eps), max(a, eps)
+        total += (a - e) * math.log(a / e)
+    return total
+
+def compare_numeric(baseline, current):
+    """PSI over baseline deciles and the KS statistic between two KLL sketches"""
+    if not baseline.n or not current.n:
+        return None
+    cuts = sorted(set(baseline.quantiles([i / PSI_BINS for i in range(1, PSI_BINS)])))
+    base_cdf = baseline.cdf(cuts) + [1.0]
+    cur_cdf = current.cdf(cuts) + [1.0]
+    base_bins = [b - a for a, b in zip([0.0] + base_cdf[:-1], base_cdf)]
+    cur_bins = [b - a for a, b in zip([0.0] + cur_cdf[:-1], cur_cdf)]
+
+    grid = sorted(set(baseline.quantiles([i / 100 for i in range(101)]) +
+                      current.quantiles([i / 100 for i in range(101)])))
+    ks = max(abs(a - b) for a, b in zip(baseline.cdf(grid), current.cdf(grid)))
+
+    return {
+        "psi": round(_psi(base_bins, cur_bins), 4),
+        "ks": round(ks, 4),
+        "baseline_median": baseline.quantiles([0.5])[0],
+        "current_median": current.quantiles([0.5])[0],
+    }
+
+def compare_categorical(baseline, current):
+    """PSI over the union of categories"""
+    if not baseline.n or not current.n:
+        return None
+    keys = sorted(set(baseline.counts) | set(current.counts))
+    base = [baseline.counts.get(k, 0) / baseline.n for k in keys]
+    cur = [current.counts.get(k, 0) / current.n for k in keys]
+    return {
+        "psi": round(_psi(base, cur), 4),
+        "baseline": {k: round(v, 4) for k, v in zip(keys, base)},
+        "current": {k: round(v, 4) for k, v in zip(keys, cur)},
+    }
+
+def _status(psi):
+    if psi is None:
+        return "insufficient_data"
+    if psi >= PSI_ALERT:
+        return "drift"
+    if psi >= PSI_WARN:
+        return "shift"
+    return "stable"
+
+
+# ==============================
+# 🛰️ Drift Monitor
+# ==============================
+def _hour_key(ts=None):
+    return datetime.fromtimestamp(ts or time.time(), tz=timezone.utc).strftime("%Y%m%d%H")
+
+
+class DriftMonitor:
+    """
+    Holds this worker's sketches for the current UTC hour. A background
+    thread writes them to DRIFT_DIR/<hour>-<pid>.json every FLUSH_INTERVAL_S
+    and on rollover, and prunes expired hours, so record() on the /predict
+    path never touches the disk. Reads merge every worker's files for the
+    requested hours.
+    """
+
+    def __init__(self, drift_dir=DRIFT_DIR, flush_interval=FLUSH_INTERVAL_S,
+                 retention_hours=RETENTION_HOURS):
+        self.drift_dir = drift_dir
+        self.flush_interval = flush_interval
+        self.retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._hour = _hour_key()
+        self._current = FeatureSketches()
+        self._closed = []  # (hour, sketches) rolled over but not yet written
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    @property
+    def baseline_path(self):
+        return os.path.join(self.drift_dir, "baseline.json")
+
+    def _snapshot_path(self, hour):
+        return os.path.join(self.drift_dir, f"{hour}-{os.getpid()}.json")
+
+    def record(self, data):
+        """Fold one prediction payload into the current hour's sketches"""
+        self._ensure_flusher()
+        hour = _hour_key()
+        with self._lock:
+            if hour != self._hour:
+                self._closed.append((self._hour, self._current))
+                self._hour = hour
+                self._current = FeatureSketches()
+                self._wakeup.set()
+            self._current.update(data)
+
+    def _ensure_flusher(self):
+        # Threads do not survive fork: each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="drift-flusher", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[DRIFT] Flush failed: {e}")
+
+    def flush(self):
+        """Write closed hours and the current hour's sketches; prune after a rollover"""
+        with self._flush_lock:
+            with self._lock:
+                closed, self._closed = self._closed, []
+                # Serialised under the lock for a consistent copy; written outside it
+                current = (self._hour, self._current.to_dict()) if self._current.n else None
+            for hour, sketches in closed:
+                if sketches.n:
+                    self._write(hour, sketches.to_dict())
+            if current:
+                self._write(*current)
+            if closed:
+                self._prune()
+
+    def _write(self, hour, snapshot):
+        try:
+            os.makedirs(self.drift_dir, exist_ok=True)
+            path = self._snapshot_path(hour)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[DRIFT] Snapshot failed: {e}")
+
+    def _prune(self):
+        cutoff = _hour_key(time.time() - self.retention_hours * 3600)
+        for path in glob.glob(os.path.join(self.drift_dir, "[0-9]*-*.json")):
+            if os.path.basename(path)[:10] < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def window(self, hours=1):
+        """Merged sketches of every worker for the last `hours` UTC hours (at most retention_hours)"""
+        hours = max(1, min(int(hours), self.retention_hours))
+        self.flush()
+        now = datetime.now(timezone.utc)
+        keys = {(now - timedelta(hours=i)).strftime("%Y%m%d%H") for i in range(hours)}
+        merged = FeatureSketches()
+        for path in glob.glob(os.path.join(self.drift_dir, "[0-9]*-*.json")):
+            if os.path.basename(path)[:10] not in keys:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    merged.merge(FeatureSketches.from_dict(json.load(f)))
+            except (OSError, ValueError) as e:
+                print(f"[DRIFT] Skipping {path}: {e}")
+        return merged
+
+    def load_baseline(self):
+        try:
+            with open(self.baseline_path, encoding="utf-8") as f:
+                return FeatureSketches.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def set_baseline(self, hours=24):
+        """Promote the merged last `hours` of traffic to the baseline"""
+        sketches = self.window(hours)
+        os.makedirs(self.drift_dir, exist_ok=True)
+        tmp = self.baseline_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sketches.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, self.baseline_path)
+        return sketches.n
+
+    def report(self, hours=1):
+        """Per-feature PSI/KS of the last `hours` against the baseline"""
+        current = self.window(hours)
+        baseline = self.load_baseline()
+        report = {
+            "window_hours": hours,
+            "current_count": current.n,
+            "baseline_count": baseline.n if baseline else 0,
+            "features": {},
+        }
+        if baseline is None:
+            report["status"] = "no_baseline"
+            return report
+
+        worst = 0.0
+        for name, _ in NUMERIC_FEATURES:
+            result = compare_numeric(baseline.numeric[name], current.numeric[name])
+            report["features"][name] = dict(result or {}, status=_status(result and result["psi"]))
+            worst = max(worst, result["psi"] if result else 0.0)
+        for name, _ in CATEGORICAL_FEATURES:
+            result = compare_categorical(baseline.categorical[name], current.categorical[name])
+            report["features"][name] = dict(result or {}, status=_status(result and result["psi"]))
+            worst = max(worst, result["psi"] if result else 0.0)
+        report["status"] = _status(worst) if current.n else "insufficient_data"
+        return report
@@ -3,6 +3,10 @@ Fraud Detection Algorithm for FraudGuard AI
 Uses multiple features to detect fraudulent transactions
 """
 
+# risk_score >= 5.0 maps to probability >= 0.65, so the served decision is
+# a single probability cut (used to judge shadow candidates the same way)
+FRAUD_PROBABILITY_THRESHOLD = 0.65
+
 def detect_fraud(transaction_data):
     """
     Analyze transaction data and return fraud prediction
@@ -44,6 +48,10 @@ def detect_fraud(transaction_data):
     merchant_mismatch = int(transaction_data.get('merchant_category_mismatch', 0))
     daily_limit_exceeded = int(transaction_data.get('user_daily_limit_exceeded', 0))
     high_value_flags = int(transaction_data.get('recent_high_value_flags', 0))
+    cluster_size = int(transaction_data.get('recipient_cluster_size', 0))
+    cluster_fraud_rate = float(transaction_data.get('recipient_cluster_fraud_rate', 0))
+    distinct_recipients = int(transaction_data.get('sender_distinct_recipients_24h', 0))
+    device_accounts = int(transaction_data.get('device_distinct_accounts_24h', 0))
     
     # ========== HIGH-RISK FLAGS (Critical Indicators) ==========
     
@@ -189,6 +197,34 @@ def detect_fraud(transaction_data):
         risk_score += 0.8
         risk_factors.append('Recent high-value transaction flags')
     
+    # ========== ACCOUNT GRAPH (FRAUD RINGS) ==========
+    
+    # Recipient sits in a connected cluster of accounts with a high fraud rate
+    if cluster_size >= 5 and cluster_fraud_rate >= 0.3:
+        risk_score += 1.5
+        risk_factors.append('Recipient linked to high-fraud account cluster')
+    elif cluster_size >= 5 and cluster_fraud_rate >= 0.1:
+        risk_score += 0.6
+        risk_factors.append('Recipient linked to account cluster with prior fraud')
+    
+    # ========== VELOCITY (DISTINCT COUNTS, LAST 24H) ==========
+    
+    # Sender fanning money out to many different recipients
+    if distinct_recipients >= 20:
+        risk_score += 1.3
+        risk_factors.append('Paid many distinct recipients in 24h')
+    elif distinct_recipients >= 10:
+        risk_score += 0.6
+        risk_factors.append('Paid several distinct recipients in 24h')
+    
+    # One device driving several sending accounts
+    if device_accounts >= 5:
+        risk_score += 1.5
+        risk_factors.append('Device used by many accounts in 24h')
+    elif device_accounts >= 3:
+        risk_score += 0.7
+        risk_factors.append('Device shared across accounts in 24h')
+    
     # ========== CALCULATE FINAL SCORES ==========
     
     # Cap risk score at maximum
@@ -212,7 +248,7 @@ def detect_fraud(transaction_data):
     probability = min(probability, 0.98)
     probability = max(probability, 0.02)
     
-    # Determine prediction
+    # Determine prediction (equivalent to probability >= FRAUD_PROBABILITY_THRESHOLD)
     if risk_score >= 5.0 or probability >= 0.7:
         prediction = 'Fraudulent'
     else:
@@ -0,0 +1,144 @@
+"""
+Incremental fraud-ring detection for FraudGuard AI
+Union-find (union by size, path halving) over from_account/to_account
+edges. Each component root carries its account count, transaction count,
+fraud count and total amount, so "which cluster is this recipient in and
+how dirty is it" is a near-constant-time lookup for the scorer.
+
+The union-find is folded from the transactions table (see
+table_follower.RowidIndex for watermarks, deletes and snapshots). An
+edit to an already folded row shows up after the next rebuild.
+"""
+
+import os
+from array import array
+
+from table_follower import RowidIndex
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PATH = os.getenv("FRAUDGUARD_RINGS_SNAPSHOT", os.path.join(BASE_DIR, "fraud_rings.snapshot"))
+SNAPSHOT_INTERVAL_S = float(os.getenv("FRAUDGUARD_RINGS_SNAPSHOT_S", "300"))
+CATCH_UP_INTERVAL_S = float(os.getenv("FRAUDGUARD_RINGS_CATCH_UP_S", "1.0"))
+SNAPSHOT_VERSION = 3
+ARRAYS = ("parent", "size", "txns", "frauds", "amount")
+
+
+class FraudRingIndex(RowidIndex):
+    """Connected components of the account graph with per-component aggregates"""
+
+    COLUMNS = ("from_account", "to_account", "transaction_amount", "prediction")
+    SNAPSHOT_VERSION = SNAPSHOT_VERSION
+    LOG_TAG = "RINGS"
+
+    def __init__(self, snapshot_path=SNAPSHOT_PATH):
+        super().__init__(snapshot_path, CATCH_UP_INTERVAL_S, SNAPSHOT_INTERVAL_S)
+
+    def _clear(self):
+        self._ids = {}
+        self._parent = array("q")
+        self._size = array("q")
+        self._txns = array("q")
+        self._frauds = array("q")
+        self._amount = array("d")
+
+    # ------------------------------
+    # Union-find core
+    # ------------------------------
+    def _node(self, account):
+        node = self._ids.get(account)
+        if node is None:
+            node = len(self._parent)
+            self._ids[account] = node
+            self._parent.append(node)
+            self._size.append(1)
+            self._txns.append(0)
+            self._frauds.append(0)
+            self._amount.append(0.0)
+        return node
+
+    def _find(self, node):
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size[rb]
+        self._txns[ra] += self._txns[rb]
+        self._frauds[ra] += self._frauds[rb]
+        self._amount[ra] += self._amount[rb]
+        return ra
+
+    def _add(self, from_account, to_account, amount, prediction):
+        accounts = [a for a in (from_account, to_account) if a]
+        if not accounts:
+            return
+        nodes = [self._node(a) for a in accounts]
+        root = self._union(nodes[0], nodes[-1]) if len(nodes) == 2 else self._find(nodes[0])
+        self._txns[root] += 1
+        self._amount[root] += float(amount or 0)
+        if prediction == "Fraudulent":
+            self._frauds[root] += 1
+
+    def add_transaction(self, from_account, to_account, amount=0.0, prediction=None):
+        """Fold one edge in directly (no watermark change)"""
+        with self._lock:
+            self._add(from_account, to_account, amount, prediction)
+
+    # ------------------------------
+    # Lookups
+    # ------------------------------
+    def component(self, account):
+        """Aggregates of the account's cluster, or None for an unseen account"""
+        self.maybe_catch_up()
+        with self._lock:
+            node = self._ids.get(account)
+            if node is None:
+                return None
+            root = self._find(node)
+            txns = self._txns[root]
+            return {
+                "size": self._size[root],
+                "transactions": txns,
+                "frauds": self._frauds[root],
+                "fraud_rate": round(self._frauds[root] / txns, 4) if txns else 0,
+                "total_amount": round(self._amount[root], 2),
+            }
+
+    def scorer_features(self, account):
+        """Fields detect_fraud understands; empty for unseen accounts"""
+        component = self.component(account) if account else None
+        if component is None:
+            return {}
+        return {
+            "recipient_cluster_size": component["size"],
+            "recipient_cluster_fraud_rate": component["fraud_rate"],
+        }
+
+    # ------------------------------
+    # Folding and snapshots
+    # ------------------------------
+    def _apply(self, rows):
+        for r in rows:
+            self._add(r["from_account"], r["to_account"], r["transaction_amount"], r["prediction"])
+
+    def _dump(self):
+        state = {name: getattr(self, f"_{name}").tobytes() for name in ARRAYS}
+        state["ids"] = list(self._ids)
+        return state
+
+    def _restore(self, state):
+        self._ids = {account: i for i, account in enumerate(state["ids"])}
+        for name in ARRAYS:
+            getattr(self, f"_{name}").frombytes(state[name])
+
+    def stats(self):
+        with self._lock:
+            return {"accounts": len(self._ids), "watermarks": list(self.watermarks.values())}
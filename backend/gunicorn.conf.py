@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for FraudGuard AI
+
+    gunicorn "app:create_app()"
+
+The app is preloaded so create_app() runs once in the master: schema
+init and model loading happen before fork and workers inherit them.
+
+Workers are threaded (gthread) so admission.AdmissionController sees the
+concurrency it is meant to bound: each worker runs up to
+FRAUDGUARD_MAX_IN_FLIGHT requests, has FRAUDGUARD_MAX_QUEUE more threads
+that can wait in its queue (counted in the p99), and
+FRAUDGUARD_SHED_THREADS beyond that which find the queue full and answer
+the fast 503. worker_connections equals threads and keep-alive is off, so
+every accepted connection has a thread: none wait in gthread's executor
+queue, where the controller could not see them. With the sync worker
+class a worker handles one request at a time and the limits never engage.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+preload_app = True
+
+# Same defaults as admission.py (this file is read before the app is importable)
+worker_class = "gthread"
+threads = (int(os.getenv("FRAUDGUARD_MAX_IN_FLIGHT", "16")) + int(os.getenv("FRAUDGUARD_MAX_QUEUE", "32"))
+           + int(os.getenv("FRAUDGUARD_SHED_THREADS", "8")))
+worker_connections = threads
+keepalive = 0
+
+# Seconds a worker may go silent before the master restarts it; profiler.py
+# reads the same variable to keep /admin/profile under it
+timeout = int(os.getenv("FRAUDGUARD_WORKER_TIMEOUT", "30"))
@@ -0,0 +1,372 @@
+"""
+Append-only ingest log for FraudGuard AI
+/save_transaction appends each record to a segment file with a single
+buffered write; a background applier drains the log into SQLite (and,
+optionally, Neo4j) in large batches. Ingest therefore runs at disk-append
+speed and keeps going while SQLite is locked or under maintenance.
+
+On-disk layout (one directory per writing process):
+
+    ingest/worker-<pid>/00000000000000000001.seg
+    ingest/worker-<pid>/applied.offset        {"segment": 1, "offset": 4096}
+
+A directory whose process has died (a worker gunicorn replaced after a
+timeout, crash or max_requests) is adopted by a live applier: renamed to
+recovering-<adopter pid>-<tag>, which makes the claim atomic, replayed,
+then removed.
+
+Each record is  <u32 length><u32 crc32(payload)><payload JSON>.
+A short or CRC-mismatched tail is a torn write: the active segment waits
+for it to complete, a sealed or recovered segment stops there.
+
+Records SQLite still rejects when written one by one are moved to
+ingest/dead-letter-<pid>.jsonl so the applied offset keeps moving.
+"""
+
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+import database as db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INGEST_DIR = os.getenv("FRAUDGUARD_INGEST_DIR", os.path.join(BASE_DIR, "ingest"))
+SEGMENT_BYTES = int(os.getenv("FRAUDGUARD_INGEST_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+BATCH_SIZE = int(os.getenv("FRAUDGUARD_INGEST_BATCH", "1000"))
+FLUSH_INTERVAL_S = float(os.getenv("FRAUDGUARD_INGEST_FLUSH_S", "0.05"))
+ENABLED = os.getenv("FRAUDGUARD_INGEST_LOG", "1") == "1"
+FSYNC = os.getenv("FRAUDGUARD_INGEST_FSYNC", "0") == "1"
+MIRROR_NEO4J = os.getenv("FRAUDGUARD_INGEST_NEO4J", "0") == "1"
+ADOPT_INTERVAL_S = float(os.getenv("FRAUDGUARD_INGEST_ADOPT_S", "10"))
+
+HEADER = struct.Struct("<II")
+OFFSET_FILE = "applied.offset"
+
+
+def _segment_name(seq):
+    return f"{seq:020d}.seg"
+
+def _segments(directory):
+    """Sorted (seq, path) pairs of a log directory"""
+    found = []
+    for path in glob.glob(os.path.join(directory, "*.seg")):
+        try:
+            found.append((int(os.path.basename(path)[:-4]), path))
+        except ValueError:
+            continue
+    return sorted(found)
+
+def encode_record(data):
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def read_records(path, offset, limit):
+    """
+    Up to `limit` decoded records starting at byte `offset`.
+    Returns (records, next_offset, clean) where clean is False when the
+    read stopped at a short or corrupt record rather than end of file.
+    """
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while len(records) < limit:
+            header = f.read(HEADER.size)
+            if not header:
+                return records, offset, True
+            if len(header) < HEADER.size:
+                return records, offset, False
+            length, crc = HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return records, offset, False
+            records.append(json.loads(payload))
+            offset += HEADER.size + length
+    return records, offset, True
+
+def _read_offset(directory):
+    try:
+        with open(os.path.join(directory, OFFSET_FILE), encoding="utf-8") as f:
+            state = json.load(f)
+        return state["segment"], state["offset"]
+    except (OSError, ValueError, KeyError):
+        return 0, 0
+
+def _write_offset(directory, segment, offset):
+    path = os.path.join(directory, OFFSET_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"segment": segment, "offset": offset}, f)
+    os.replace(tmp, path)
+
+
+def _dead_letter(ingest_dir, record, error):
+    os.makedirs(ingest_dir, exist_ok=True)
+    path = os.path.join(ingest_dir, f"dead-letter-{os.getpid()}.jsonl")
+    line = json.dumps({"ts": round(time.time(), 3), "error": repr(error), "record": record},
+                      separators=(",", ":"), default=str)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def _apply(batch, ingest_dir=INGEST_DIR):
+    """
+    Write a batch to SQLite; returns how many records were dead-lettered.
+    A rejected batch is retried row by row and only the rows that still
+    fail are set aside. OperationalError (locked, disk full) is transient
+    and propagates so the caller retries the whole batch later; saves are
+    upserts, so rows already written are simply written again.
+    """
+    written = batch
+    try:
+        db.save_transactions(batch)
+    except sqlite3.OperationalError:
+        raise
+    except Exception:
+        written = []
+        for record in batch:
+            try:
+                db.save_transactions([record])
+                written.append(record)
+            except sqlite3.OperationalError:
+                raise
+            except Exception as e:
+                print(f"[INGEST] Dead-lettering {record.get('id') if isinstance(record, dict) else record!r}: {e}")
+                _dead_letter(ingest_dir, record, e)
+    if MIRROR_NEO4J:
+        import neo4j_service
+        for record in written:
+            try:
+                neo4j_service.save_transaction(record)
+            except Exception as e:
+                print(f"[INGEST] Neo4j mirror failed for {record.get('id')}: {e}")
+    return len(batch) - len(written)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # EPERM: exists, owned by another user
+        return True
+    return True
+
+def _parse_dir(directory):
+    """(kind, owner pid, tag) of worker-<pid> or recovering-<pid>-<tag>; owner None if unparsable"""
+    kind, _, rest = os.path.basename(directory).partition("-")
+    owner, _, tag = rest.partition("-")
+    try:
+        return kind, int(owner), tag
+    except ValueError:
+        return kind, None, tag
+
+def _claim(directory):
+    """
+    Rename a log directory to recovering-<our pid>-<tag>; returns the new
+    path, or None when another process claimed it first.
+    """
+    kind, owner, tag = _parse_dir(directory)
+    if kind == "recovering" and owner == os.getpid():
+        return directory
+    if kind == "worker":
+        tag = f"{owner}.{time.time_ns()}"
+    claimed = os.path.join(os.path.dirname(directory), f"recovering-{os.getpid()}-{tag}")
+    try:
+        os.rename(directory, claimed)
+    except OSError:
+        return None
+    return claimed
+
+def recover(ingest_dir=INGEST_DIR, on_applied=None, skip_own=False):
+    """
+    Replay every unapplied record left by processes that are no longer
+    running, then remove their directories. Runs at startup (before this
+    process opens its own log) and periodically from every applier, with
+    skip_own so the caller's live log is left alone. Never raises: a
+    directory that cannot be replayed now is left for the next attempt.
+    """
+    replayed = 0
+    me = os.getpid()
+    candidates = glob.glob(os.path.join(ingest_dir, "worker-*")) + \
+        glob.glob(os.path.join(ingest_dir, "recovering-*"))
+    for directory in sorted(candidates):
+        kind, owner, _ = _parse_dir(directory)
+        if owner is None or (owner != me and _pid_alive(owner)):
+            continue
+        if kind == "worker" and owner == me and skip_own:
+            continue
+        claimed = _claim(directory)
+        if claimed is None:
+            continue
+        try:
+            replayed += _replay(claimed, ingest_dir)
+        except Exception as e:
+            print(f"[INGEST] Could not replay {claimed}, leaving it for the next attempt: {e}")
+            continue
+        shutil.rmtree(claimed, ignore_errors=True)
+    if replayed:
+        print(f"[INGEST] Replayed {replayed} records from stopped processes")
+        if on_applied:
+            try:
+                on_applied(replayed)
+            except Exception as e:
+                print(f"[INGEST] on_applied failed after replay: {e}")
+    return replayed
+
+
+def _replay(directory, ingest_dir):
+    """Apply every record of a log directory past its offset; returns records read"""
+    replayed = 0
+    segment, offset = _read_offset(directory)
+    for seq, path in _segments(directory):
+        if seq < segment:
+            continue
+        position = offset if seq == segment else 0
+        while True:
+            records, position, clean = read_records(path, position, BATCH_SIZE)
+            if records:
+                _apply(records, ingest_dir)
+                replayed += len(records)
+                _write_offset(directory, seq, position)
+            if len(records) < BATCH_SIZE:
+                if not clean:
+                    print(f"[INGEST] Torn tail in {path} at byte {position}; discarding the rest")
+                break
+    return replayed
+
+
+class IngestLog:
+    """
+    Per-process segment writer plus its background applier thread.
+    Both are created lazily on first append so each forked worker gets
+    its own directory, file handle and thread.
+    """
+
+    def __init__(self, ingest_dir=INGEST_DIR, segment_bytes=SEGMENT_BYTES,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL_S, on_applied=None):
+        self.ingest_dir = ingest_dir
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_applied = on_applied
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self.appended = 0
+        self.applied = 0
+        self.apply_errors = 0
+        self.dead_lettered = 0
+        self.adopted = 0
+
+    # ------------------------------
+    # Writer
+    # ------------------------------
+    def _open(self):
+        self.directory = os.path.join(self.ingest_dir, f"worker-{os.getpid()}")
+        if os.path.isdir(self.directory):
+            # Left by an earlier process with our (reused) pid: set it aside
+            # for the applier to replay instead of appending after it
+            _claim(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        existing = _segments(self.directory)
+        self._seq = existing[-1][0] + 1 if existing else 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._seq)), "ab")
+        self._size = 0
+        self._apply_seq, self._apply_offset = self._seq, 0
+        _write_offset(self.directory, self._apply_seq, self._apply_offset)
+        self._last_adopt = float("-inf")
+        self._thread = threading.Thread(target=self._run, name="ingest-applier", daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    def append(self, data):
+        """Durably queue one record (one write call); returns its segment sequence"""
+        record = encode_record(data)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            if self._size and self._size + len(record) > self.segment_bytes:
+                self._rotate()
+            self._file.write(record)
+            self._file.flush()
+            if FSYNC:
+                os.fsync(self._file.fileno())
+            self._size += len(record)
+            self.appended += 1
+            seq = self._seq
+        self._wakeup.set()
+        return seq
+
+    def _rotate(self):
+        self._file.close()
+        self._seq += 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._seq)), "ab")
+        self._size = 0
+
+    # ------------------------------
+    # Applier
+    # ------------------------------
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=1.0)
+            # Let a burst accumulate into one batch
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self.drain_once():
+                    pass
+            except Exception as e:
+                self.apply_errors += 1
+                print(f"[INGEST] Apply failed, will retry: {e}")
+                time.sleep(1.0)
+            if time.monotonic() - self._last_adopt >= ADOPT_INTERVAL_S:
+                self._last_adopt = time.monotonic()
+                self.adopted += recover(self.ingest_dir, self.on_applied, skip_own=True)
+
+    def drain_once(self):
+        """Apply one batch; returns True if more may be waiting"""
+        path = os.path.join(self.directory, _segment_name(self._apply_seq))
+        records, next_offset, clean = read_records(path, self._apply_offset, self.batch_size)
+        if records:
+            self.dead_lettered += _apply(records, self.ingest_dir)
+            self._apply_offset = next_offset
+            _write_offset(self.directory, self._apply_seq, self._apply_offset)
+            self.applied += len(records)
+            if self.on_applied:
+                self.on_applied(len(records))
+            return True
+
+        with self._lock:
+            sealed = self._apply_seq < self._seq
+        if not sealed:
+            return False
+        if not clean:
+            print(f"[INGEST] Corrupt record in sealed {path} at byte {self._apply_offset}; skipping the rest")
+        # Sealed segment fully applied: move on and delete it
+        os.remove(path)
+        self._apply_seq += 1
+        self._apply_offset = 0
+        _write_offset(self.directory, self._apply_seq, self._apply_offset)
+        return True
+
+    def stats(self):
+        with self._lock:
+            active = self._pid == os.getpid()
+            return {
+                "appended": self.appended,
+                "applied": self.applied,
+                "lag": self.appended - self.applied,
+                "apply_errors": self.apply_errors,
+                "dead_lettered": self.dead_lettered,
+                "adopted": self.adopted,
+                "segment": self._seq if active else None,
+                "applied_segment": self._apply_seq if active else None,
+            }
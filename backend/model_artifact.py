@@ -0,0 +1,201 @@
+"""
+Memory-mapped forest artifacts for FraudGuard AI
+A tree ensemble is flattened into a handful of raw NumPy arrays that every
+worker opens with mmap_mode="r", so N workers share one physical copy in
+the page cache instead of each unpickling its own trees.
+
+Layout of one artifact (a directory under ARTIFACT_DIR):
+
+    models/<version>/meta.json       feature names, tree count, max depth
+    models/<version>/left.npy        int32, global child index (-1 at leaves)
+    models/<version>/right.npy       int32
+    models/<version>/feature.npy     int32 (-2 at leaves)
+    models/<version>/threshold.npy   float64, go left when x <= threshold
+    models/<version>/value.npy       float64, P(fraud) at the node
+    models/<version>/cover.npy       float64, weighted training samples at the node
+    models/<version>/roots.npy       int32, root node of each tree
+    models/CURRENT                   name of the live version
+
+Usage:
+    python model_artifact.py convert fraud_model.pkl [version]
+    python model_artifact.py promote <version>
+"""
+
+import json
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_DIR = os.getenv("FRAUDGUARD_ARTIFACT_DIR", os.path.join(BASE_DIR, "models"))
+POINTER_FILE = "CURRENT"
+FORMAT_VERSION = 1
+ARRAYS = ("left", "right", "feature", "threshold", "value", "cover", "roots")
+
+
+class ForestArtifact:
+    """Read-only, memory-mapped tree ensemble scoring P(fraud) as the forest mean"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported artifact format {meta.get('format')}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        self._init(arrays, meta)
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """In-memory artifact (e.g. straight from flatten_forest, no files)"""
+        artifact = cls.__new__(cls)
+        artifact.path = None
+        artifact._init(arrays, meta)
+        return artifact
+
+    def _init(self, arrays, meta):
+        self.meta = meta
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.version = self.meta["version"]
+        self.feature_names = self.meta["feature_names"]
+        self.max_depth = self.meta["max_depth"]
+        self.n_trees = len(self.roots)
+
+    def leaves(self, X):
+        """Leaf node reached in every tree, shape (n_rows, n_trees)"""
+        # scikit-learn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(np.asarray(self.roots), (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[nodes]
+            children = np.where(go_left, self.left[nodes], self.right[nodes])
+            nodes = np.where(internal, children, nodes)
+        return nodes
+
+    def predict_proba(self, X):
+        """P(fraud) per row (1-D)"""
+        return self.value[self.leaves(X)].mean(axis=1)
+
+    def warm(self):
+        """Fault every page in so the first real request does not pay for it"""
+        for name in ARRAYS:
+            np.asarray(getattr(self, name)).sum()
+        self.predict_proba(np.zeros((1, len(self.feature_names))))
+        return self
+
+
+# ==============================
+# 🔁 Version Pointer
+# ==============================
+def pointer_path(artifact_dir=None):
+    return os.path.join(artifact_dir or ARTIFACT_DIR, POINTER_FILE)
+
+def read_pointer(artifact_dir=None):
+    """Live version name, or None when no artifact has been promoted"""
+    try:
+        with open(pointer_path(artifact_dir), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def promote(version, artifact_dir=None):
+    """Atomically point CURRENT at an existing artifact version"""
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    ForestArtifact(os.path.join(artifact_dir, version))  # refuse to promote a broken artifact
+    tmp = pointer_path(artifact_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, pointer_path(artifact_dir))
+
+def load_current(artifact_dir=None):
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    version = read_pointer(artifact_dir)
+    if version is None:
+        return None
+    return ForestArtifact(os.path.join(artifact_dir, version))
+
+
+# ==============================
+# 🛠️ Pickle Converter
+# ==============================
+def flatten_forest(forest, version):
+    """(arrays, meta) for a fitted scikit-learn RandomForestClassifier"""
+    left, right, feature, threshold, value, cover, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        roots.append(offset)
+        is_leaf = tree.children_left < 0
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(tree.feature)
+        threshold.append(tree.threshold)
+        counts = tree.value[:, 0, :]
+        value.append(counts[:, 1] / counts.sum(axis=1))
+        cover.append(tree.weighted_n_node_samples)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    arrays = {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "cover": np.concatenate(cover).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    names = getattr(forest, "feature_names_in_", None)
+    meta = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "feature_names": [str(n) for n in names] if names is not None else None,
+        "n_trees": len(roots),
+        "n_nodes": offset,
+        "max_depth": int(max_depth),
+    }
+    return arrays, meta
+
+def convert_pickle(pkl_path, version=None, artifact_dir=None):
+    """Flatten a pickled scikit-learn RandomForestClassifier into an artifact directory"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(pkl_path, "rb") as f:
+            forest = pickle.load(f)
+
+    version = version or time.strftime("v%Y%m%d%H%M%S")
+    out = os.path.join(artifact_dir or ARTIFACT_DIR, version)
+    os.makedirs(out, exist_ok=False)
+
+    arrays, meta = flatten_forest(forest, version)
+    meta["source"] = os.path.basename(pkl_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(out, f"{name}.npy"), array)
+    with open(os.path.join(out, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "convert":
+        path = convert_pickle(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"✅ Wrote artifact {path}")
+        print(f"   Promote with: python model_artifact.py promote {os.path.basename(path)}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "promote":
+        promote(sys.argv[2])
+        print(f"✅ CURRENT -> {sys.argv[2]}")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,212 @@
+"""
+Model loading for FraudGuard AI
+Loads the read-only RandomForest once, ideally in the gunicorn master
+before workers fork, so every worker shares the same pages. When a
+memory-mapped artifact has been promoted (see model_artifact.py) it is
+preferred over the pickle, and workers hot-swap to a newly promoted
+version between requests without a restart.
+"""
+
+import os
+import pickle
+import threading
+import time
+import warnings
+
+import model_artifact
+import tree_explainer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.getenv("FRAUDGUARD_MODEL_PATH", os.path.join(BASE_DIR, "fraud_model.pkl"))
+RELOAD_CHECK_S = float(os.getenv("FRAUDGUARD_MODEL_RELOAD_S", "1.0"))
+
+# Column order the RandomForest was trained with (categoricals one-hot, first level dropped)
+FEATURE_NAMES = [
+    "transaction_amount", "transaction_frequency", "behavioral_biometrics",
+    "time_since_last_transaction", "social_trust_score", "account_age",
+    "normalized_transaction_amount", "transaction_context_anomalies",
+    "fraud_complaints_count", "recipient_blacklist_status", "device_fingerprinting",
+    "vpn_proxy_usage", "high_risk_transaction_times", "past_fraudulent_behavior",
+    "location_inconsistent", "merchant_category_mismatch", "user_daily_limit_exceeded",
+    "recent_high_value_flags", "recipient_verification_status_suspicious",
+    "recipient_verification_status_verified", "geo_location_flags_normal",
+    "geo_location_flags_unusual",
+]
+
+# Defaults mirror fraud_detector.detect_fraud so both scorers see the same input
+_NUMERIC_DEFAULTS = {
+    "social_trust_score": 50,
+    "account_age": 1,
+}
+
+_model = None
+_version = None
+_last_check = 0.0
+_swap_lock = threading.Lock()
+_explainer = None  # (model, TreeExplainer or None) so a swap invalidates it by identity
+_explainer_lock = threading.Lock()
+
+def _open_artifact(version):
+    artifact = model_artifact.ForestArtifact(os.path.join(model_artifact.ARTIFACT_DIR, version))
+    if artifact.feature_names not in (None, FEATURE_NAMES):
+        raise ValueError("feature columns do not match FEATURE_NAMES")
+    return artifact.warm()
+
+def load_model(path=None):
+    """
+    Load the fraud model once per process tree; returns None if unavailable.
+    The promoted mmap artifact wins over the pickle unless a path is given.
+    """
+    global _model, _version
+    if _model is None and path is None:
+        version = model_artifact.read_pointer()
+        if version:
+            try:
+                _model = _open_artifact(version)
+                _version = version
+                print(f"[MODEL] Mapped artifact {version} ({_model.n_trees} trees)")
+                return _model
+            except Exception as e:
+                print(f"[MODEL] Could not open artifact {version}: {e}; falling back to pickle")
+
+    if _model is None:
+        path = path or MODEL_PATH
+        try:
+            with warnings.catch_warnings():
+                # Pickled with an older scikit-learn; the tree layout is unchanged
+                warnings.simplefilter("ignore")
+                with open(path, "rb") as f:
+                    model = pickle.load(f)
+        except Exception as e:
+            print(f"[MODEL] Could not load {path}: {e}")
+            return None
+
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None:
+            if list(names) != FEATURE_NAMES:
+                print(f"[MODEL] Feature columns of {path} do not match FEATURE_NAMES; not loading")
+                return None
+            # Rows are built in FEATURE_NAMES order; drop the names so scikit-learn
+            # does not warn on every unnamed row
+            del model.feature_names_in_
+
+        # Per-request scoring is a single row: joblib's thread fan-out costs more than it saves
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = 1
+        _model = model
+        _version = os.path.basename(path)
+        print(f"[MODEL] Loaded {type(model).__name__} from {path}")
+    return _model
+
+def get_model():
+    """Return the preloaded model (None if load_model() was never called or failed)"""
+    return _model
+
+def current_version():
+    return _version
+
+def unload_model():
+    global _model, _version
+    _model = None
+    _version = None
+
+def maybe_reload():
+    """
+    Cheap per-request check of the artifact pointer (at most once per
+    RELOAD_CHECK_S). A new version is opened and warmed on a background
+    thread, then swapped in with a single reference assignment; requests
+    already holding the old model finish on it.
+    """
+    global _last_check
+    now = time.monotonic()
+    if now - _last_check < RELOAD_CHECK_S:
+        return
+    _last_check = now
+    version = model_artifact.read_pointer()
+    if version is None or version == _version or _swap_lock.locked():
+        return
+    threading.Thread(target=_swap, args=(version,), name="model-swap", daemon=True).start()
+
+def _swap(version):
+    global _model, _version, _explainer
+    with _swap_lock:
+        if version == _version:
+            return
+        try:
+            artifact = _open_artifact(version)
+        except Exception as e:
+            print(f"[MODEL] Not swapping to {version}: {e}")
+            return
+        _explainer = (artifact, _build_explainer(artifact, version))
+        _model, _version = artifact, version
+        print(f"[MODEL] Swapped to artifact {version} in pid {os.getpid()}")
+
+def _build_explainer(forest, version):
+    """TreeExplainer for a flattened forest, or None when it is too deep to tabulate"""
+    try:
+        return tree_explainer.TreeExplainer(forest, FEATURE_NAMES)
+    except ValueError as e:
+        print(f"[MODEL] Explanations disabled for {version}: {e}")
+        return None
+
+def get_explainer():
+    """
+    TreeSHAP explainer for the live model, built once per model version
+    (~0.2 s). create_app() builds it pre-fork and _swap() builds the new
+    one off the request path. None when no model is loaded or the model
+    is too deep to explain (it is still served).
+    """
+    global _explainer
+    model = _model
+    if model is None:
+        return None
+    cached = _explainer
+    if cached is not None and cached[0] is model:
+        return cached[1]
+    with _explainer_lock:
+        if _explainer is None or _explainer[0] is not model:
+            forest = model
+            if not isinstance(model, model_artifact.ForestArtifact):
+                arrays, meta = model_artifact.flatten_forest(model, _version)
+                forest = model_artifact.ForestArtifact.from_arrays(arrays, meta)
+            _explainer = (model, _build_explainer(forest, _version))
+        return _explainer[1]
+
+def explain(data, top_k=3):
+    """Probability, base value and top contributing factors, or None without an explainer"""
+    explainer = get_explainer()
+    if explainer is None:
+        return None
+    return explainer.explain(build_feature_vector(data), top_k=top_k)
+
+def _score(model, vectors):
+    if isinstance(model, model_artifact.ForestArtifact):
+        return model.predict_proba(vectors)
+    return model.predict_proba(vectors)[:, 1]
+
+def build_feature_vector(data):
+    """Map a /predict payload onto the model's feature columns"""
+    vector = []
+    for name in FEATURE_NAMES[:18]:
+        vector.append(float(data.get(name, _NUMERIC_DEFAULTS.get(name, 0)) or 0))
+    recipient_status = data.get("recipient_verification_status", "verified")
+    geo_flags = data.get("geo_location_flags", "normal")
+    vector.append(1.0 if recipient_status == "suspicious" else 0.0)
+    vector.append(1.0 if recipient_status == "verified" else 0.0)
+    vector.append(1.0 if geo_flags == "normal" else 0.0)
+    vector.append(1.0 if geo_flags == "unusual" else 0.0)
+    return vector
+
+def predict_proba(data):
+    """Fraud probability from the model, or None when no model is loaded"""
+    model = _model
+    if model is None:
+        return None
+    return float(_score(model, [build_feature_vector(data)])[0])
+
+def predict_proba_batch(vectors):
+    """Fraud probabilities for prebuilt feature vectors (one model call per batch)"""
+    model = _model
+    if model is None:
+        raise RuntimeError("model not loaded")
+    return _score(model, vectors)
@@ -0,0 +1,198 @@
+"""
+On-demand profiling for FraudGuard AI
+Two opt-in tools for latency spikes, both off (and free) by default:
+
+* sample(seconds): a statistical sampler over every thread of this worker,
+  reading sys._current_frames() every few milliseconds and returning
+  collapsed stacks ("thread;frame;frame count" lines, flamegraph-ready).
+  Served by GET /admin/profile when FRAUDGUARD_ADMIN_TOKEN is set. The
+  request thread blocks while sampling, which needs threaded (gthread)
+  workers, and is capped below the worker timeout either way.
+
+* SlowRequestRecorder: with FRAUDGUARD_SLOW_REQUEST_MS set, samples the
+  stack of each in-flight request and times its SQL statements; requests
+  slower than the threshold are kept in a bounded ring buffer, the rest
+  are discarded. When unset no hooks are installed at all.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import database as db
+
+ADMIN_TOKEN = os.getenv("FRAUDGUARD_ADMIN_TOKEN")
+SLOW_REQUEST_MS = float(os.getenv("FRAUDGUARD_SLOW_REQUEST_MS", "0"))
+SAMPLE_INTERVAL_S = float(os.getenv("FRAUDGUARD_PROFILE_INTERVAL_MS", "5")) / 1000
+SLOW_BUFFER_SIZE = int(os.getenv("FRAUDGUARD_SLOW_REQUEST_BUFFER", "100"))
+# Same default as gunicorn.conf.py; a profile must finish well inside it
+WORKER_TIMEOUT_S = int(os.getenv("FRAUDGUARD_WORKER_TIMEOUT", "30"))
+MAX_PROFILE_SECONDS = max(1, min(60, WORKER_TIMEOUT_S - 5))
+MAX_STACK_DEPTH = 128
+TOP_STACKS = 50
+
+
+def authorized(request):
+    """True when the request carries the admin token (never when none is configured)"""
+    if not ADMIN_TOKEN:
+        return False
+    header = request.headers.get("Authorization", "")
+    token = header[7:] if header.startswith("Bearer ") else request.headers.get("X-Admin-Token", "")
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def collapse(frame, root=None):
+    """One stack as "root;outer;...;inner" (frames as "function (file:line)")"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    if root:
+        names.append(root)
+    return ";".join(reversed(names))
+
+
+def format_collapsed(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# ==============================
+# 🔬 Whole-worker Sampler
+# ==============================
+_sampling = threading.Lock()
+
+def sample(seconds, interval=SAMPLE_INTERVAL_S):
+    """
+    Sample every other thread for `seconds`; returns (Counter of collapsed
+    stacks, number of sampling rounds). Raises RuntimeError if a profile
+    is already running in this worker.
+    """
+    if not _sampling.acquire(blocking=False):
+        raise RuntimeError("a profile is already running in this worker")
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        rounds = 0
+        deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+            rounds += 1
+            time.sleep(interval)
+        return stacks, rounds
+    finally:
+        _sampling.release()
+
+
+# ==============================
+# 🐢 Slow-request Capture
+# ==============================
+class _Capture:
+    __slots__ = ("start", "method", "path", "stacks", "sql")
+
+    def __init__(self, method, path):
+        self.start = time.perf_counter()
+        self.method = method
+        self.path = path
+        self.stacks = Counter()
+        self.sql = {}  # statement -> [calls, seconds]
+
+
+class SlowRequestRecorder:
+    """Per-request stack samples and SQL timings, kept only for slow requests"""
+
+    def __init__(self, threshold_ms=SLOW_REQUEST_MS, interval=SAMPLE_INTERVAL_S,
+                 buffer_size=SLOW_BUFFER_SIZE):
+        self.threshold_s = threshold_ms / 1000
+        self.interval = interval
+        self.records = deque(maxlen=buffer_size)
+        self._active = {}  # thread ident -> _Capture
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self.requests = 0
+        self.captured = 0
+
+    def install(self, app):
+        """Hook into the Flask app and the database layer"""
+        app.before_request(self.begin)
+        app.teardown_request(self.end)
+        db.set_query_observer(self.observe_query)
+        return self
+
+    def begin(self):
+        from flask import request
+        self._ensure_sampler()
+        self._active[threading.get_ident()] = _Capture(request.method, request.path)
+        self._wakeup.set()
+
+    def end(self, exc=None):
+        capture = self._active.pop(threading.get_ident(), None)
+        if capture is None:
+            return
+        elapsed = time.perf_counter() - capture.start
+        self.requests += 1
+        if elapsed < self.threshold_s:
+            return
+        self.captured += 1
+        self.records.append({
+            "method": capture.method,
+            "path": capture.path,
+            "duration_ms": round(elapsed * 1000, 2),
+            "at": time.time(),
+            "error": repr(exc) if exc is not None else None,
+            "samples": sum(capture.stacks.values()),
+            "stacks": format_collapsed(Counter(dict(capture.stacks.most_common(TOP_STACKS)))),
+            "sql": sorted(
+                ({"sql": " ".join(sql.split()), "calls": calls, "ms": round(seconds * 1000, 3)}
+                 for sql, (calls, seconds) in capture.sql.items()),
+                key=lambda q: q["ms"], reverse=True
+            ),
+        })
+
+    def observe_query(self, sql, seconds, executed):
+        capture = self._active.get(threading.get_ident())
+        if capture is None:
+            return  # background threads and startup
+        stat = capture.sql.setdefault(sql, [0, 0.0])
+        stat[0] += executed
+        stat[1] += seconds
+
+    def _ensure_sampler(self):
+        # Threads do not survive fork: each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._active = {}
+            threading.Thread(target=self._run, name="slow-request-sampler", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                # Idle between requests: block instead of polling
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, capture in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    capture.stacks[collapse(frame)] += 1
+
+    def snapshot(self):
+        return {
+            "threshold_ms": self.threshold_s * 1000,
+            "requests": self.requests,
+            "captured": self.captured,
+            "records": list(self.records),
+        }
@@ -0,0 +1,190 @@
+"""
+Shadow scoring for FraudGuard AI
+Candidate models score live traffic off the request path: /predict drops
+the feature vector into a bounded queue and a background thread scores
+batches against every registered candidate, comparing with the score that
+was actually served. A full queue drops items instead of pushing back.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from fraud_detector import FRAUD_PROBABILITY_THRESHOLD
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SHADOW_DIR = os.getenv("FRAUDGUARD_SHADOW_DIR", os.path.join(BASE_DIR, "shadow"))
+QUEUE_SIZE = int(os.getenv("FRAUDGUARD_SHADOW_QUEUE", "2048"))
+BATCH_SIZE = int(os.getenv("FRAUDGUARD_SHADOW_BATCH", "64"))
+# Disagreement files rotate to .1 at this size (so at most twice this per process)
+MAX_FILE_BYTES = int(float(os.getenv("FRAUDGUARD_SHADOW_MAX_MB", "64")) * 1024 * 1024)
+# Candidates are judged by the served decision rule unless registered with their own
+DECISION_THRESHOLD = FRAUD_PROBABILITY_THRESHOLD
+
+
+class CandidateStats:
+    """Running comparison of one candidate against the served score"""
+
+    def __init__(self):
+        self.scored = 0
+        self.disagreements = 0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        # |delta| histogram in 0.1-wide buckets
+        self.delta_histogram = [0] * 10
+        self.errors = 0
+
+    def add(self, delta, disagree):
+        magnitude = abs(delta)
+        self.scored += 1
+        self.abs_delta_sum += magnitude
+        self.max_abs_delta = max(self.max_abs_delta, magnitude)
+        self.delta_histogram[min(int(magnitude * 10), 9)] += 1
+        if disagree:
+            self.disagreements += 1
+
+    def to_dict(self):
+        return {
+            "scored": self.scored,
+            "disagreements": self.disagreements,
+            "disagreement_rate": round(self.disagreements / self.scored, 4) if self.scored else 0,
+            "mean_abs_delta": round(self.abs_delta_sum / self.scored, 4) if self.scored else 0,
+            "max_abs_delta": round(self.max_abs_delta, 4),
+            "delta_histogram": list(self.delta_histogram),
+            "errors": self.errors,
+        }
+
+
+class ShadowScorer:
+    """
+    Bounded queue plus one daemon thread per process.
+
+    Candidates are callables taking a list of feature vectors and returning
+    a fraud probability per vector. Disagreements (candidate probability on
+    the other side of its threshold from the served prediction) are
+    appended to a per-process JSON-lines file under SHADOW_DIR, rotated at
+    max_file_bytes; everything else only updates the in-memory counters.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, shadow_dir=SHADOW_DIR,
+                 max_file_bytes=MAX_FILE_BYTES):
+        self.batch_size = batch_size
+        self.shadow_dir = shadow_dir
+        self.max_file_bytes = max_file_bytes
+        self._queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._candidates = {}  # name -> (score_batch, threshold)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.enqueued = 0
+        self.dropped = 0
+
+    def register_candidate(self, name, score_batch, threshold=DECISION_THRESHOLD):
+        with self._lock:
+            self._candidates[name] = (score_batch, threshold)
+            self._stats.setdefault(name, CandidateStats())
+
+    def unregister_candidate(self, name):
+        with self._lock:
+            self._candidates.pop(name, None)
+
+    def submit(self, transaction_id, features, served_probability, served_prediction):
+        """Non-blocking enqueue; returns False when the item was dropped"""
+        if not self._candidates:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((transaction_id, features, served_probability, served_prediction))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _ensure_worker(self):
+        # Threads do not survive fork: each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._queue_size)
+            self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.score_batch(batch)
+            except Exception as e:
+                print(f"[SHADOW] Batch failed: {e}")
+
+    def score_batch(self, batch):
+        """Score one batch with every candidate and record the comparison"""
+        vectors = [item[1] for item in batch]
+        with self._lock:
+            candidates = list(self._candidates.items())
+
+        disagreements = []
+        for name, (score, threshold) in candidates:
+            stats = self._stats[name]
+            try:
+                probabilities = score(vectors)
+            except Exception as e:
+                stats.errors += 1
+                print(f"[SHADOW] Candidate {name} failed: {e}")
+                continue
+
+            for (txn_id, features, served_prob, served_pred), prob in zip(batch, probabilities):
+                prob = float(prob)
+                candidate_pred = "Fraudulent" if prob >= threshold else "Legitimate"
+                disagree = candidate_pred != served_pred
+                stats.add(prob - served_prob, disagree)
+                if disagree:
+                    disagreements.append({
+                        "ts": round(time.time(), 3),
+                        "id": txn_id,
+                        "candidate": name,
+                        "served": served_pred,
+                        "served_probability": served_prob,
+                        "candidate_probability": round(prob, 4),
+                        "features": features,
+                    })
+
+        if disagreements:
+            self._write(disagreements)
+
+    def _write(self, records):
+        os.makedirs(self.shadow_dir, exist_ok=True)
+        path = os.path.join(self.shadow_dir, f"disagreements-{os.getpid()}.jsonl")
+        try:
+            if os.path.getsize(path) >= self.max_file_bytes:
+                os.replace(path, path + ".1")
+        except FileNotFoundError:
+            pass
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+
+    def snapshot(self):
+        with self._lock:
+            candidates = {name: stats.to_dict() for name, stats in self._stats.items()}
+            for name, (_, threshold) in self._candidates.items():
+                candidates[name]["threshold"] = threshold
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "candidates": candidates,
+        }
@@ -0,0 +1,145 @@
+"""
+In-memory static asset serving for FraudGuard AI
+The built dashboard in static/dist is read once at startup into a manifest
+of content-hashed entries with precompressed gzip (and brotli, when the
+optional `brotli` package is installed) variants. Requests are answered
+from memory: no filesystem calls, ETag/304 handling, and immutable
+caching for the hashed URLs that index.html is rewritten to reference.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is fine
+    brotli = None
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# Smaller bodies fit in one packet anyway; compressing them only costs CPU
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json",
+                      "image/svg+xml", "application/xml")
+
+
+class Asset:
+    """One servable file: its encodings, ETag and cache policy"""
+
+    def __init__(self, name, body, content_type, cache_control):
+        self.name = name
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {"identity": body}
+        if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_BYTES:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants["br"] = br
+
+    def etag(self, encoding):
+        # Each representation needs its own strong validator
+        return self.digest if encoding == "identity" else f"{self.digest}-{encoding}"
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if token and not (q and float(q.group(1)) == 0):
+            accepted.add(token)
+    return accepted
+
+
+class AssetManifest:
+    """
+    Maps request paths to in-memory Assets. Every non-HTML file is also
+    published under a hashed name (app.<digest>.js); HTML files are
+    rewritten to point at those names and are served with no-cache so a
+    deploy is picked up on the next revalidation.
+    """
+
+    def __init__(self, dist_dir):
+        self.dist_dir = dist_dir
+        self.assets = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        assets, html = {}, {}
+        for root, _, files in os.walk(self.dist_dir):
+            for filename in files:
+                full = os.path.join(root, filename)
+                name = os.path.relpath(full, self.dist_dir).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type == "text/html":
+                    html[name] = body
+                    continue
+                asset = Asset(name, body, content_type, REVALIDATE_CACHE)
+                assets[name] = asset
+                base, ext = os.path.splitext(name)
+                hashed = f"{base}.{asset.digest}{ext}"
+                assets[hashed] = Asset(hashed, body, content_type, IMMUTABLE_CACHE)
+
+        for name, body in html.items():
+            text = body.decode("utf-8")
+            for original in list(assets):
+                if assets[original].cache_control != REVALIDATE_CACHE:
+                    continue
+                base, ext = os.path.splitext(original)
+                hashed = f"{base}.{assets[original].digest}{ext}"
+                text = re.sub(r'(["\'])(\./)?' + re.escape(original) + r'\1', r"\1\2" + hashed + r"\1", text)
+            assets[name] = Asset(name, text.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE)
+
+        self.assets = assets
+        self._loaded = True
+        print(f"[ASSETS] Loaded {len(assets)} entries from {self.dist_dir}")
+        return self
+
+    def get(self, path):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        return self.assets.get(path)
+
+    def respond(self, asset, request):
+        """Build the response for an asset, honouring Accept-Encoding and If-None-Match"""
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding"))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in accepted:
+                encoding = candidate
+                break
+
+        etag = asset.etag(encoding)
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match:
+            tags = {t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")}
+            if etag in tags or "*" in tags:
+                return Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.variants[encoding], status=200, headers=headers,
+                        content_type=asset.content_type)
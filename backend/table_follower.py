@@ -0,0 +1,225 @@
+"""
+Following the transactions table for FraudGuard AI
+The in-memory indexes (fraud_rings, velocity) are folds over the
+transactions table. RowidIndex is their shared base: it keeps one rowid
+watermark per shard and folds in rows past it in batches, so every
+gunicorn worker sees every save whichever worker handled it. Re-saving
+an id keeps its rowid (saves are upserts), so it is not folded twice.
+
+A fold cannot take a row back out, and deletes let SQLite reuse rowids,
+so every delete bumps db.delete_epochs() and the index starts over when
+that moves. Snapshots on disk let a restart replay only the tail. Once
+follow() is called, a per-worker Follower thread does the catching up
+and lookups never query SQLite.
+"""
+
+import os
+import pickle
+import threading
+import time
+
+import database as db
+
+BATCH_ROWS = 10000
+
+
+class Follower:
+    """
+    Daemon thread calling fn every `interval` seconds, at most one per
+    process. Threads do not survive fork, so start() is called in every
+    worker; once running it is a pid check.
+    """
+
+    def __init__(self, fn, interval, name, log_tag):
+        self.fn = fn
+        self.interval = interval
+        self.name = name
+        self.log_tag = log_tag
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def running(self):
+        return self._pid == os.getpid()
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name=self.name, daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.fn()
+            except Exception as e:
+                print(f"[{self.log_tag}] {self.name} failed: {e}")
+
+
+class RowidIndex:
+    """
+    Base of an index folded from the transactions table by rowid.
+
+    Subclasses set COLUMNS (what _apply reads), SNAPSHOT_VERSION and
+    LOG_TAG, and implement _clear(), _apply(rows), _dump() and
+    _restore(state); all four run with self._lock held.
+    """
+
+    COLUMNS = ()
+    SNAPSHOT_VERSION = 1
+    LOG_TAG = "INDEX"
+
+    def __init__(self, snapshot_path, catch_up_interval, snapshot_interval):
+        self.snapshot_path = snapshot_path
+        self.catch_up_interval = catch_up_interval
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        # Serialises catch_up/rebuild: a batch fetched before a reset must not
+        # be applied after it (it would push the watermark past unreplayed rows)
+        self._catch_up_lock = threading.RLock()
+        self._follower = Follower(self.catch_up, catch_up_interval,
+                                  f"{self.LOG_TAG.lower()}-follower", self.LOG_TAG)
+        self._reset()
+        self._last_catch_up = 0.0
+        self._last_snapshot = time.monotonic()
+
+    def _reset(self):
+        self._clear()
+        # Highest rowid folded in, per transactions shard (None = single database)
+        self.watermarks = {shard: 0 for shard in db.transaction_shards()}
+        # db.delete_epochs() the watermarks are valid for (None until the first catch-up)
+        self.epochs = None
+
+    # ------------------------------
+    # Subclass hooks
+    # ------------------------------
+    def _clear(self):
+        raise NotImplementedError
+
+    def _apply(self, rows):
+        raise NotImplementedError
+
+    def _dump(self):
+        """Index state for a snapshot, as a dict of picklable values"""
+        raise NotImplementedError
+
+    def _restore(self, state):
+        raise NotImplementedError
+
+    def _compatible(self, state):
+        """False when a snapshot of the right version was taken with other settings"""
+        return True
+
+    # ------------------------------
+    # Following SQLite
+    # ------------------------------
+    def catch_up(self):
+        """
+        Apply every transactions row past each shard's watermark; returns
+        rows applied. Starts over when rows were deleted since the last call.
+        """
+        with self._catch_up_lock:
+            epochs = db.delete_epochs()
+            if epochs != self.epochs:
+                with self._lock:
+                    if self.epochs is not None:
+                        self._reset()
+                    self.epochs = epochs
+            sql = (f"SELECT rowid AS rid, {', '.join(self.COLUMNS)} FROM transactions "
+                   "WHERE rowid > ? ORDER BY rowid LIMIT ?")
+            applied = 0
+            for shard in list(self.watermarks):
+                while True:
+                    rows = db.query(sql, (self.watermarks[shard], BATCH_ROWS), shard=shard)
+                    if not rows:
+                        break
+                    with self._lock:
+                        self._apply(rows)
+                        self.watermarks[shard] = rows[-1]["rid"]
+                    applied += len(rows)
+                    if len(rows) < BATCH_ROWS:
+                        break
+            self._last_catch_up = time.monotonic()
+            if time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+                self.save_snapshot(background=True)
+            return applied
+
+    def maybe_catch_up(self):
+        """Called by lookups: catch up inline unless a follower thread does it"""
+        if self._follower.running:
+            return
+        if time.monotonic() - self._last_catch_up >= self.catch_up_interval:
+            self.catch_up()
+
+    def follow(self):
+        """Catch up every catch_up_interval on this worker's follower thread from now on"""
+        self._follower.start()
+        return self
+
+    def rebuild(self):
+        """Drop everything and refold the transactions table"""
+        with self._catch_up_lock:
+            with self._lock:
+                self._reset()
+            return self.catch_up()
+
+    # ------------------------------
+    # Snapshots
+    # ------------------------------
+    def save_snapshot(self, background=False):
+        self._last_snapshot = time.monotonic()
+        with self._lock:
+            state = dict(self._dump(), version=self.SNAPSHOT_VERSION,
+                         watermarks=dict(self.watermarks), epochs=self.epochs)
+        if background:
+            threading.Thread(target=self._write_snapshot, args=(state,), daemon=True).start()
+        else:
+            self._write_snapshot(state)
+
+    def _write_snapshot(self, state):
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            print(f"[{self.LOG_TAG}] Snapshot failed: {e}")
+
+    def load_snapshot(self):
+        """Restore from disk; False if there is no usable snapshot"""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if state.get("version") != self.SNAPSHOT_VERSION or not self._compatible(state):
+            return False
+        with self._catch_up_lock, self._lock:
+            self._reset()
+            self._restore(state)
+            self.watermarks = dict(state["watermarks"])
+            self.epochs = state["epochs"]
+        return True
+
+    def start(self):
+        """
+        Startup path: resume from the snapshot when it is not ahead of the
+        table (a shrunken table means deletes happened), otherwise rebuild.
+        """
+        max_rowids = {
+            shard: db.query("SELECT COALESCE(MAX(rowid), 0) AS m FROM transactions", one=True, shard=shard)["m"]
+            for shard in db.transaction_shards()
+        }
+        if (self.load_snapshot() and self.watermarks.keys() == max_rowids.keys()
+                and all(self.watermarks[shard] <= m for shard, m in max_rowids.items())):
+            applied = self.catch_up()
+            print(f"[{self.LOG_TAG}] Resumed from snapshot, applied {applied} new rows")
+        else:
+            applied = self.rebuild()
+            print(f"[{self.LOG_TAG}] Rebuilt from {applied} transactions")
+        self.save_snapshot()
+        return self
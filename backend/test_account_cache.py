@@ -0,0 +1,97 @@
+"""
+Test script for the account profile cache
+"""
+
+import os
+import tempfile
+from datetime import datetime
+import database as db
+import account_cache
+
+def test_account_cache():
+    print("=" * 60)
+    print("Testing Account Cache")
+    print("=" * 60)
+
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "accounts.db")
+        db.init_db()
+        try:
+            # Test 1: Upsert keeps fields that are not given
+            print("\n1. Testing upsert...")
+            assert db.create_or_update_account("alice", email="a@example.com", social_trust_score=25)
+            assert db.create_or_update_account("alice", name="Alice")
+            alice = db.get_account("alice")
+            print(f"   {alice}")
+            assert alice["email"] == "a@example.com" and alice["name"] == "Alice"
+            assert alice["social_trust_score"] == 25 and alice["revision"] == 2
+
+            # Test 2: Read-through, negative caching and write-through invalidation
+            print("\n2. Testing read-through cache...")
+            cache = account_cache.AccountCache(sync_interval=3600)
+            assert cache.get("alice")["name"] == "Alice"
+            assert cache.get("nobody") is None and cache.get("nobody") is None
+            assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 1
+            cache.upsert("alice", social_trust_score=80)
+            assert cache.get("alice")["social_trust_score"] == 80
+
+            # Test 3: Writes from another worker are picked up on sync
+            print("\n3. Testing cross-process invalidation...")
+            db.create_or_update_account("alice", past_fraudulent_behavior=1)
+            assert cache.get("alice")["past_fraudulent_behavior"] == 0
+            assert cache.sync() == 1
+            assert cache.get("alice")["past_fraudulent_behavior"] == 1
+
+            # Test 4: Batched prefetch and the LRU bound
+            print("\n4. Testing prefetch and LRU bound...")
+            for i in range(10):
+                db.create_or_update_account(f"u{i}")
+            small = account_cache.AccountCache(max_entries=5, sync_interval=3600)
+            found = small.prefetch([f"u{i}" for i in range(8)] + ["ghost"])
+            print(f"   Prefetched {len(found)}: {small.stats()}")
+            assert len(found) == 8 and small.stats()["entries"] == 5
+
+            # Test 5: Server-side fill-in never overrides the payload
+            print("\n5. Testing scorer fill-in...")
+            db.create_or_update_account("bob", created_at="2024-01-01T00:00:00", social_trust_score=10)
+            filled = cache.fill_missing({"from_account": "bob", "social_trust_score": 70},
+                                        now=datetime(2026, 1, 1))
+            print(f"   {filled}")
+            assert filled["social_trust_score"] == 70 and filled["past_fraudulent_behavior"] == 0
+            assert abs(filled["account_age"] - 2.0) < 0.01
+
+            # Test 6: Degraded callers never query SQLite on a miss
+            print("\n6. Testing cached-only lookups...")
+            cold = account_cache.AccountCache(sync_interval=3600)
+            cold.sync()
+            assert cold.fill_missing({"from_account": "bob"}, cached_only=True) == {"from_account": "bob"}
+            assert cold.stats()["entries"] == 0
+            assert cold.get("bob")["social_trust_score"] == 10
+            assert cold.get("bob", cached_only=True)["social_trust_score"] == 10
+
+            # Test 7: Account fields are type-checked; stray text never reaches the scorer
+            print("\n7. Testing account field validation...")
+            assert db.normalize_account({"social_trust_score": "42", "past_fraudulent_behavior": True}) == \
+                {"social_trust_score": 42.0, "past_fraudulent_behavior": 1}
+            for bad in ({"social_trust_score": "high"}, {"past_fraudulent_behavior": "no"},
+                        {"created_at": "yesterday"}, [1]):
+                try:
+                    db.normalize_account(bad)
+                    raise AssertionError(f"accepted {bad!r}")
+                except ValueError:
+                    pass
+            db.create_or_update_account("carol", social_trust_score="high", past_fraudulent_behavior="no")
+            filled = cold.fill_missing({"from_account": "carol"})
+            print(f"   {filled}")
+            assert "social_trust_score" not in filled and "past_fraudulent_behavior" not in filled
+        finally:
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Account Cache Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_account_cache()
@@ -0,0 +1,72 @@
+"""
+Test script for keyset-paginated account history
+"""
+
+import os
+import tempfile
+import database as db
+
+def page_all(account_id, role, limit):
+    rows, cursor = [], None
+    while True:
+        page = db.get_account_transactions(account_id, role=role, cursor=cursor, limit=limit)
+        rows.extend(page["transactions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows
+
+def test_account_history():
+    print("=" * 60)
+    print("Testing Account History")
+    print("=" * 60)
+
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "history.db")
+        db.init_db()
+        try:
+            for i in range(5):
+                db.save_transaction({"id": f"dated-{i}", "from_account": "acct", "to_account": f"peer-{i}",
+                                     "transaction_amount": 10, "timestamp": f"2026-01-0{i + 1}T00:00:00"})
+            # Rows written before saves were stamped have no timestamp at all
+            with db.connect_db() as conn:
+                conn.executemany("INSERT INTO transactions (id, from_account, to_account, transaction_amount) "
+                                 "VALUES (?, ?, ?, 10)",
+                                 [(f"undated-{i}", "acct" if i % 2 else f"peer-{i}", "acct") for i in range(5)])
+                conn.commit()
+            db.save_transaction({"id": "self", "from_account": "acct", "to_account": "acct",
+                                 "transaction_amount": 10, "timestamp": "2026-01-03T12:00:00"})
+
+            # Test 1: Paging returns every row once, undated rows last
+            print("\n1. Testing paging through dated and undated rows...")
+            summary = db.get_account_summary("acct")
+            for limit in (1, 3, 4, 50):
+                rows = page_all("acct", "both", limit)
+                ids = [r["id"] for r in rows]
+                assert len(ids) == len(set(ids)) == summary["count"] == 11, (limit, ids)
+            print(f"   Order: {ids}")
+            assert ids[:4] == ["dated-4", "dated-3", "self", "dated-2"]
+            assert ids[-5:] == [f"undated-{i}" for i in (4, 3, 2, 1, 0)]
+
+            # Test 2: Per-role paging agrees with the per-role summary
+            print("\n2. Testing sender/recipient roles...")
+            for role in ("sender", "recipient"):
+                rows = page_all("acct", role, 2)
+                print(f"   {role}: {len(rows)} rows")
+                assert len(rows) == len({r["id"] for r in rows}) == db.get_account_summary("acct", role=role)["count"]
+
+            # Test 3: New saves are stamped, so they never land among the undated rows
+            print("\n3. Testing default timestamp...")
+            db.save_transaction({"id": "stamped", "from_account": "acct", "to_account": "x"})
+            assert db.get_transaction_by_id("stamped")["timestamp"]
+            assert page_all("acct", "both", 5)[0]["id"] == "stamped"
+        finally:
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Account History Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_account_history()
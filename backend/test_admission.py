@@ -0,0 +1,124 @@
+"""
+Test script for admission control and degraded mode
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import admission
+import database as db
+
+def test_admission():
+    print("=" * 60)
+    print("Testing Admission Controller")
+    print("=" * 60)
+
+    # Test 1: Load shedding once slots and queue are exhausted
+    print("\n1. Testing load shedding...")
+    ctl = admission.AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=50)
+    held = ctl.admit()
+    results = []
+
+    def waiter():
+        try:
+            ctl.admit().__exit__(None, None, None)
+            results.append("admitted")
+        except admission.Overloaded as e:
+            results.append(e.reason)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    t.join()
+    print(f"   Queued request: {results[0]}")
+    assert results == ["queue timeout"]
+
+    ctl.waiting = ctl.max_queue  # simulate a full queue
+    try:
+        ctl.admit()
+        shed = False
+    except admission.Overloaded as e:
+        shed = e.reason == "queue full"
+    ctl.waiting = 0
+    held.__exit__(None, None, None)
+    print(f"   Shed counts: {ctl.snapshot()['shed']}")
+    assert shed and ctl.snapshot()["shed"] == 2
+
+    # Test 2: Degrade when full-path p99 exceeds the budget
+    print("\n2. Testing degraded mode...")
+    ctl = admission.AdmissionController(p99_budget_ms=100, min_samples=16,
+                                        min_degraded_s=0, probe_every=4)
+    for _ in range(32):
+        with ctl._lock:
+            ctl._record(0.5)
+    print(f"   Mode after slow requests: {ctl.mode}")
+    assert ctl.mode == admission.MODE_DEGRADED
+
+    with ctl.admit() as ticket:
+        paths = [ctl.use_full_path(ticket) for _ in range(8)]
+    print(f"   Full-path probes while degraded: {sum(paths)}/8")
+    assert sum(paths) == 2
+
+    # Test 3: Recover once probes come back under budget
+    print("\n3. Testing recovery...")
+    for _ in range(512):
+        with ctl._lock:
+            ctl._record(0.01)
+    print(f"   Mode after fast requests: {ctl.mode}")
+    assert ctl.mode == admission.MODE_NORMAL
+
+    # Test 4: Recovery is bounded by the time window, not by request count
+    print("\n4. Testing time-based p99 window...")
+    ctl = admission.AdmissionController(p99_budget_ms=100, window_s=30, min_degraded_s=10, probe_every=20)
+    now = 0.0
+    while ctl.mode == admission.MODE_NORMAL:
+        now += 0.01
+        with ctl._lock:
+            ctl._record(0.5, now)
+    degraded_at = now
+    for _ in range(10):  # slow probes while still degraded
+        now += 0.1
+        with ctl._lock:
+            ctl._record(0.5, now)
+    probes = 0
+    while ctl.mode == admission.MODE_DEGRADED and probes < 10000:
+        now += 0.2  # one probe per 20 requests at 100 requests/s
+        probes += 1
+        with ctl._lock:
+            ctl._record(0.01, now)
+    print(f"   Recovered {now - degraded_at:.1f} s after degrading, {probes} fast probes")
+    assert ctl.mode == admission.MODE_NORMAL and now - degraded_at < 32
+
+    # Test 5: A request's SQLite lock waits end at its deadline
+    print("\n5. Testing deadline-bounded SQLite waits...")
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "busy.db")
+        db.init_db()
+        blocker = sqlite3.connect(db.DB_PATH)
+        try:
+            blocker.execute("BEGIN IMMEDIATE")
+            db.set_busy_timeout(0.1)
+            started = time.monotonic()
+            try:
+                with db.connect_db() as conn:
+                    conn.execute("INSERT INTO accounts (account_id) VALUES ('locked')")
+                raise AssertionError("write went through a held lock")
+            except sqlite3.OperationalError:
+                waited = time.monotonic() - started
+            print(f"   Gave up after {waited * 1000:.0f} ms")
+            assert waited < 1
+        finally:
+            blocker.rollback()
+            blocker.close()
+            db.set_busy_timeout(None)
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Admission Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_admission()
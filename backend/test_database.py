@@ -11,6 +11,9 @@ def test_database():
     print("Testing FraudGuard AI Database")
     print("=" * 50)
     
+    # Schema init is an explicit startup step (no longer done on import)
+    db.init_db()
+    
     # Test 1: Create Account
     print("\n1. Testing account creation...")
     success = db.create_or_update_account(
@@ -0,0 +1,86 @@
+"""
+Test script for the streaming drift monitor
+"""
+
+import os
+import random
+import tempfile
+import time
+import drift_monitor as dm
+
+def test_drift_monitor():
+    print("=" * 60)
+    print("Testing Drift Monitor")
+    print("=" * 60)
+    rng = random.Random(7)
+
+    # Test 1: KLL quantile accuracy and bounded size
+    print("\n1. Testing KLL quantiles...")
+    sketch = dm.KLLSketch()
+    values = [rng.random() for _ in range(100000)]
+    for v in values:
+        sketch.update(v)
+    median = sketch.quantiles([0.5])[0]
+    print(f"   Median estimate: {median:.4f} (items kept: {sketch.size})")
+    assert abs(median - 0.5) < 0.02
+    assert sketch.size < 1000
+
+    # Test 2: Merging worker sketches
+    print("\n2. Testing sketch merge...")
+    a, b = dm.KLLSketch(), dm.KLLSketch()
+    for _ in range(20000):
+        a.update(rng.random())
+        b.update(rng.random() + 1.0)
+    merged = dm.KLLSketch.from_dict(a.to_dict()).merge(b)
+    print(f"   Merged n: {merged.n}, median: {merged.quantiles([0.5])[0]:.4f}")
+    assert merged.n == 40000
+    assert abs(merged.quantiles([0.5])[0] - 1.0) < 0.05
+
+    # Test 3: PSI / KS flag a shifted amount distribution
+    print("\n3. Testing drift report...")
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = dm.DriftMonitor(drift_dir=tmp)
+        for _ in range(5000):
+            monitor.record({"transaction_amount": rng.gauss(1000, 200), "geo_location_flags": "normal"})
+        monitor.set_baseline(hours=1)
+        report = monitor.report()
+        print(f"   Same traffic: {report['features']['transaction_amount']['status']}")
+        assert report["features"]["transaction_amount"]["status"] == "stable"
+
+        monitor = dm.DriftMonitor(drift_dir=tmp)
+        for _ in range(5000):
+            monitor.record({"transaction_amount": rng.gauss(1600, 200), "geo_location_flags": "unusual"})
+        report = monitor.report()
+        amount = report["features"]["transaction_amount"]
+        print(f"   Shifted traffic: {amount['status']} (PSI {amount['psi']}, KS {amount['ks']})")
+        assert amount["status"] == "drift" and amount["ks"] > 0.5
+        assert report["features"]["geo_location_flags"]["status"] == "drift"
+
+    # Test 4: record() leaves the disk to the flusher; rollover writes and prunes
+    print("\n4. Testing background flush and rollover...")
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = dm.DriftMonitor(drift_dir=tmp, flush_interval=3600, retention_hours=2)
+        monitor._ensure_flusher = lambda: None  # flush by hand below
+        expired = os.path.join(tmp, f"{dm._hour_key(time.time() - 5 * 3600)}-1.json")
+        open(expired, "w").close()
+        monitor._hour = dm._hour_key(time.time() - 3600)
+        monitor.record({"transaction_amount": 10})
+        monitor._hour = dm._hour_key(time.time() - 3600)  # force a rollover on the next record
+        monitor.record({"transaction_amount": 20})
+        assert sorted(os.listdir(tmp)) == [os.path.basename(expired)]
+        monitor.flush()
+        files = sorted(os.listdir(tmp))
+        print(f"   Files after flush: {files}")
+        assert len(files) == 2 and os.path.basename(expired) not in files
+        assert monitor.window(2).n == 2
+        # Windows past the retention are clamped to it, not built hour by hour
+        started = time.time()
+        assert monitor.window(10 ** 8).n == 2
+        assert time.time() - started < 1
+
+    print("\n" + "=" * 60)
+    print("Drift Monitor Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_drift_monitor()
@@ -0,0 +1,122 @@
+"""
+Test script for incremental fraud-ring detection
+"""
+
+import os
+import tempfile
+import threading
+import database as db
+import fraud_rings
+
+def test_fraud_rings():
+    print("=" * 60)
+    print("Testing Fraud Ring Index")
+    print("=" * 60)
+
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "rings.db")
+        db.init_db()
+        try:
+            # Test 1: Two separate clusters joined by one transfer
+            print("\n1. Testing incremental unions...")
+            rings = fraud_rings.FraudRingIndex(snapshot_path=os.path.join(tmp, "rings.snapshot")).start()
+            edges = [("a", "b", "Fraudulent"), ("b", "c", "Legitimate"),
+                     ("x", "y", "Legitimate"), ("c", "x", "Fraudulent")]
+            for i, (src, dst, pred) in enumerate(edges):
+                db.save_transaction({"id": f"ring-{i}", "from_account": src, "to_account": dst,
+                                     "transaction_amount": 100, "prediction": pred})
+                rings.catch_up()
+                if i == 2:
+                    print(f"   Before bridge: a={rings.component('a')['size']} x={rings.component('x')['size']}")
+                    assert rings.component("a")["size"] == 3 and rings.component("x")["size"] == 2
+
+            component = rings.component("y")
+            print(f"   After bridge: {component}")
+            assert component["size"] == 5 and component["transactions"] == 4
+            assert component["frauds"] == 2 and component["fraud_rate"] == 0.5
+
+            # Test 2: Snapshot + tail replay matches a full rebuild
+            print("\n2. Testing snapshot restore...")
+            rings.save_snapshot()
+            db.save_transaction({"id": "ring-late", "from_account": "z", "to_account": "a",
+                                 "transaction_amount": 50, "prediction": "Legitimate"})
+            restored = fraud_rings.FraudRingIndex(snapshot_path=rings.snapshot_path).start()
+            rebuilt = fraud_rings.FraudRingIndex(snapshot_path=os.path.join(tmp, "other.snapshot"))
+            rebuilt.rebuild()
+            print(f"   Restored: {restored.component('z')}")
+            assert restored.component("z") == rebuilt.component("z")
+            assert restored.component("z")["size"] == 6
+
+            # Test 3: Re-saves are not counted twice; deletes are noticed by every worker
+            print("\n3. Testing re-saves and deletes...")
+            before = restored.component("z")
+            db.save_transaction({"id": "ring-late", "from_account": "z", "to_account": "a",
+                                 "transaction_amount": 50, "prediction": "Legitimate"})
+            restored.catch_up()
+            assert restored.component("z") == before
+            # rebuilt stands in for another worker: it only ever calls catch_up()
+            rebuilt.catch_up()
+            assert db.delete_transaction("ring-late") == 1
+            db.save_transaction({"id": "ring-reused", "from_account": "p", "to_account": "q",
+                                 "transaction_amount": 10, "prediction": "Legitimate"})
+            rebuilt.catch_up()
+            print(f"   After delete + save: z={rebuilt.component('z')} p={rebuilt.component('p')}")
+            assert rebuilt.component("z") is None and rebuilt.component("p")["size"] == 2
+            assert rebuilt.component("a")["transactions"] == 4
+
+            db.delete_all_transactions()
+            db.save_transaction({"id": "ring-after-clear", "from_account": "m", "to_account": "n"})
+            rebuilt.catch_up()
+            assert rebuilt.component("a") is None and rebuilt.component("m")["size"] == 2
+
+            # Test 4: A batch fetched before a rebuild is not applied after it
+            print("\n4. Testing catch_up racing a rebuild...")
+            db.delete_all_transactions()
+            racy = fraud_rings.FraudRingIndex(snapshot_path=os.path.join(tmp, "racy.snapshot"))
+            for i in range(12):
+                db.save_transaction({"id": f"race-{i}", "from_account": "a", "to_account": f"r{i % 2}"})
+                if i == 5:
+                    racy.catch_up()  # watermark at row 6: the stale batch is rows 7-12
+            fetched, gate, rebuilding = threading.Event(), threading.Event(), threading.Event()
+            original_query = db.query
+
+            def interleaved_query(sql, *args, **kwargs):
+                name = threading.current_thread().name
+                if "rowid >" in sql and name == "rebuild" and not rebuilding.is_set():
+                    # Reset already done: let the stale batch land before fetching
+                    rebuilding.set()
+                    gate.set()
+                    stale.join(5)
+                rows = original_query(sql, *args, **kwargs)
+                if "rowid >" in sql and name == "stale" and not fetched.is_set():
+                    fetched.set()
+                    gate.wait(5)
+                return rows
+
+            db.query = interleaved_query
+            try:
+                stale = threading.Thread(target=racy.catch_up, name="stale")
+                stale.start()
+                fetched.wait(5)
+                rebuild = threading.Thread(target=racy.rebuild, name="rebuild")
+                rebuild.start()
+                if not rebuilding.wait(0.5):
+                    gate.set()  # rebuild is waiting for the stale catch-up to finish
+                stale.join(5)
+                rebuild.join(5)
+            finally:
+                db.query = original_query
+            component = racy.component("a")
+            print(f"   After rebuild: {component}")
+            assert component["transactions"] == 12 and component["size"] == 3
+        finally:
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Fraud Ring Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_fraud_rings()
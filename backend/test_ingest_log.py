@@ -0,0 +1,112 @@
+"""
+Test script for the append-only ingest log
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import database as db
+import ingest_log
+
+def test_ingest_log():
+    print("=" * 60)
+    print("Testing Ingest Log")
+    print("=" * 60)
+
+    original_path, original_adopt = db.DB_PATH, ingest_log.ADOPT_INTERVAL_S
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "ingest.db")
+        db.init_db()
+        log_dir = os.path.join(tmp, "ingest")
+        try:
+            # Test 1: Appends are drained into SQLite across segment rotations
+            print("\n1. Testing append + background apply...")
+            log = ingest_log.IngestLog(ingest_dir=log_dir, segment_bytes=4096, flush_interval=0.01)
+            for i in range(500):
+                log.append({"id": f"ing-{i}", "from_account": "a", "to_account": "b",
+                            "transaction_amount": i, "prediction": "Legitimate"})
+            deadline = time.time() + 10
+            while log.stats()["lag"] and time.time() < deadline:
+                time.sleep(0.05)
+            stats = log.stats()
+            count = db.query("SELECT COUNT(*) AS c FROM transactions", one=True)["c"]
+            segments = ingest_log._segments(log.directory)
+            print(f"   Stats: {stats}, rows: {count}, segments left: {len(segments)}")
+            assert count == 500 and stats["lag"] == 0
+            assert len(segments) == 1  # applied sealed segments are deleted
+
+            # Test 2: Replay of an unapplied segment with a torn tail
+            print("\n2. Testing crash recovery...")
+            crashed = os.path.join(log_dir, "worker-999999")
+            os.makedirs(crashed)
+            ingest_log._write_offset(crashed, 1, 0)
+            with open(os.path.join(crashed, ingest_log._segment_name(1)), "wb") as f:
+                for i in range(3):
+                    f.write(ingest_log.encode_record({"id": f"crash-{i}", "transaction_amount": 1}))
+                f.write(ingest_log.encode_record({"id": "torn"})[:-3])
+            replayed = ingest_log.recover(ingest_dir=log_dir, skip_own=True)
+            print(f"   Replayed: {replayed}")
+            assert replayed == 3
+            assert db.get_transaction_by_id("crash-2") is not None
+            assert db.get_transaction_by_id("torn") is None
+            assert not os.path.exists(crashed)
+
+            # Test 3: A record SQLite rejects is dead-lettered, not retried forever
+            print("\n3. Testing dead-lettering...")
+            dead_dir = os.path.join(tmp, "ingest-dead")
+            log = ingest_log.IngestLog(ingest_dir=dead_dir, flush_interval=0.01)
+            for i, sender in enumerate(["ok", {"x": 1}, "ok"]):
+                log.append({"id": f"bad-{i}", "from_account": sender, "to_account": "b"})
+            deadline = time.time() + 10
+            while log.stats()["lag"] and time.time() < deadline:
+                time.sleep(0.05)
+            stats = log.stats()
+            print(f"   Stats: {stats}")
+            assert stats["lag"] == 0 and stats["dead_lettered"] == 1
+            assert db.get_transaction_by_id("bad-2") is not None
+            with open(os.path.join(dead_dir, f"dead-letter-{os.getpid()}.jsonl")) as f:
+                assert [json.loads(line)["record"]["id"] for line in f] == ["bad-1"]
+
+            # ...and the same kind of record left over from a crash does not fail startup
+            os.makedirs(crashed)
+            ingest_log._write_offset(crashed, 1, 0)
+            with open(os.path.join(crashed, ingest_log._segment_name(1)), "wb") as f:
+                f.write(ingest_log.encode_record({"id": "bad-crash", "from_account": [1]}))
+                f.write(ingest_log.encode_record({"id": "good-crash", "from_account": "a"}))
+            assert ingest_log.recover(ingest_dir=log_dir) == 2
+            assert db.get_transaction_by_id("good-crash") is not None
+            assert db.get_transaction_by_id("bad-crash") is None
+
+            # Test 4: A live applier adopts the log of a worker that died mid-run
+            print("\n4. Testing adoption of a dead worker's log...")
+            dead = subprocess.Popen([sys.executable, "-c", "pass"])
+            dead.wait()
+            orphan = os.path.join(dead_dir, f"worker-{dead.pid}")
+            os.makedirs(orphan)
+            ingest_log._write_offset(orphan, 1, 0)
+            with open(os.path.join(orphan, ingest_log._segment_name(1)), "wb") as f:
+                f.write(ingest_log.encode_record({"id": "orphan-0", "from_account": "a"}))
+            ingest_log.ADOPT_INTERVAL_S = 0.05
+            log._last_adopt = float("-inf")
+            log.append({"id": "live-0", "from_account": "a"})
+            deadline = time.time() + 10
+            while os.path.exists(orphan) and time.time() < deadline:
+                time.sleep(0.05)
+            print(f"   Log directories left: {sorted(os.listdir(dead_dir))}")
+            assert db.get_transaction_by_id("orphan-0") is not None
+            assert log.stats()["adopted"] == 1
+            assert os.path.isdir(log.directory)  # its own live log is untouched
+        finally:
+            db.close_db()
+            db.DB_PATH = original_path
+            ingest_log.ADOPT_INTERVAL_S = original_adopt
+
+    print("\n" + "=" * 60)
+    print("Ingest Log Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_ingest_log()
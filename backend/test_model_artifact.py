@@ -0,0 +1,94 @@
+"""
+Test script for memory-mapped model artifacts and hot-swapping
+"""
+
+import os
+import pickle
+import tempfile
+import time
+import warnings
+import numpy as np
+import model_artifact
+import model_service
+
+def test_model_artifact():
+    print("=" * 60)
+    print("Testing Model Artifacts")
+    print("=" * 60)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(model_service.MODEL_PATH, "rb") as f:
+            forest = pickle.load(f)
+    del forest.feature_names_in_  # rows below are unnamed, like the served ones
+
+    original_dir = model_artifact.ARTIFACT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        model_artifact.ARTIFACT_DIR = tmp
+        model_service.unload_model()
+        try:
+            # Test 1: The flattened artifact scores exactly like scikit-learn
+            print("\n1. Testing predict_proba parity with the pickle...")
+            path = model_artifact.convert_pickle(model_service.MODEL_PATH, "v1")
+            artifact = model_artifact.ForestArtifact(path)
+            rng = np.random.default_rng(7)
+            X = rng.random((500, len(model_service.FEATURE_NAMES)))
+            X[:, :7] *= rng.choice([1, 10, 1000, 100000], size=(500, 7))
+            X[:, 7:] = X[:, 7:] > 0.5
+            sample = model_service.build_feature_vector({
+                "transaction_amount": 9500, "vpn_proxy_usage": 1, "fraud_complaints_count": 3,
+                "recipient_verification_status": "suspicious", "geo_location_flags": "unusual",
+            })
+            X = np.vstack([X, sample])
+            expected = forest.predict_proba(X)[:, 1]
+            actual = artifact.predict_proba(X)
+            print(f"   {artifact.n_trees} trees, max |diff| = {np.abs(actual - expected).max():.2e}")
+            assert artifact.n_trees == len(forest.estimators_)
+            assert artifact.feature_names == model_service.FEATURE_NAMES
+            assert np.allclose(actual, expected, rtol=0, atol=1e-12)
+
+            # Test 2: A promoted artifact wins over the pickle at load time
+            print("\n2. Testing promote + load_model...")
+            assert model_artifact.read_pointer() is None
+            model_artifact.promote("v1")
+            model = model_service.load_model()
+            print(f"   Loaded: {model_service.current_version()}")
+            assert isinstance(model, model_artifact.ForestArtifact)
+            assert model_service.current_version() == "v1"
+            assert np.allclose(model_service.predict_proba_batch([sample]), expected[-1:])
+            old_explainer = model_service.get_explainer()
+
+            # Test 3: Promoting a new version is picked up without a restart
+            print("\n3. Testing hot swap via maybe_reload()...")
+            model_artifact.convert_pickle(model_service.MODEL_PATH, "v2")
+            model_artifact.promote("v2")
+            model_service._last_check = float("-inf")
+            model_service.maybe_reload()
+            deadline = time.time() + 10
+            while model_service.current_version() != "v2" and time.time() < deadline:
+                time.sleep(0.05)
+            print(f"   Swapped to: {model_service.current_version()}")
+            assert model_service.current_version() == "v2"
+            assert model_service.get_model() is not model
+            assert model_service.get_explainer() is not old_explainer
+            assert np.allclose(model_service.predict_proba_batch([sample]), expected[-1:])
+
+            # Test 4: A broken artifact is never promoted
+            print("\n4. Testing promote refuses a broken artifact...")
+            os.remove(os.path.join(tmp, "v1", "value.npy"))
+            try:
+                model_artifact.promote("v1")
+                raise AssertionError("promote accepted a broken artifact")
+            except FileNotFoundError:
+                pass
+            assert model_artifact.read_pointer() == "v2"
+        finally:
+            model_service.unload_model()
+            model_artifact.ARTIFACT_DIR = original_dir
+
+    print("\n" + "=" * 60)
+    print("Model Artifact Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_model_artifact()
@@ -0,0 +1,86 @@
+"""
+Test script for the sampling profiler and slow-request capture
+"""
+
+import os
+import tempfile
+import threading
+import time
+from flask import Flask
+import database as db
+import profiler
+
+def test_profiler():
+    print("=" * 60)
+    print("Testing Profiler")
+    print("=" * 60)
+
+    # Test 1: The sampler sees a busy thread
+    print("\n1. Testing whole-worker sampler...")
+    stop = threading.Event()
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+    worker = threading.Thread(target=spin, name="spinner")
+    worker.start()
+    try:
+        stacks, rounds = profiler.sample(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+    spinner = sum(c for s, c in stacks.items() if s.startswith("spinner;") and "spin (" in s)
+    print(f"   {rounds} rounds, {spinner} spinner samples")
+    assert rounds > 5 and spinner > rounds // 2
+
+    # ...and never runs past its cap (kept below the worker timeout)
+    original_max = profiler.MAX_PROFILE_SECONDS
+    profiler.MAX_PROFILE_SECONDS = 0.1
+    try:
+        started = time.monotonic()
+        profiler.sample(30, interval=0.01)
+        assert time.monotonic() - started < 1
+    finally:
+        profiler.MAX_PROFILE_SECONDS = original_max
+
+    # Test 2: Only slow requests are kept, with their SQL
+    print("\n2. Testing slow-request capture...")
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "profile.db")
+        db.init_db()
+        app = Flask(__name__)
+        recorder = profiler.SlowRequestRecorder(threshold_ms=50, interval=0.005, buffer_size=2).install(app)
+
+        @app.route("/fast")
+        def fast():
+            return str(db.get_transaction_stats()["total"])
+
+        @app.route("/slow")
+        def slow():
+            db.get_transaction_stats()
+            time.sleep(0.1)
+            return "ok"
+
+        try:
+            client = app.test_client()
+            for path in ("/fast", "/slow", "/slow", "/slow"):
+                client.get(path)
+            snapshot = recorder.snapshot()
+            record = snapshot["records"][-1]
+            print(f"   {snapshot['requests']} requests, {snapshot['captured']} captured, "
+                  f"{record['samples']} samples, {len(record['sql'])} statements")
+            assert snapshot["requests"] == 4 and snapshot["captured"] == 3
+            assert len(snapshot["records"]) == 2 and record["path"] == "/slow"
+            assert record["samples"] > 0 and "slow (test_profiler.py" in record["stacks"]
+            assert record["sql"][0]["calls"] == 1 and "COUNT(*)" in record["sql"][0]["sql"]
+        finally:
+            db.set_query_observer(None)
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Profiler Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_profiler()
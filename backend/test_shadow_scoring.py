@@ -0,0 +1,85 @@
+"""
+Test script for background shadow scoring
+"""
+
+import json
+import os
+import queue
+import random
+import tempfile
+import shadow_scoring
+from fraud_detector import detect_fraud
+
+def test_shadow_scoring():
+    print("=" * 60)
+    print("Testing Shadow Scoring")
+    print("=" * 60)
+    shadow_dir = tempfile.mkdtemp()
+
+    # Test 1: The default threshold is the served decision rule
+    print("\n1. Testing the served decision threshold...")
+    rng = random.Random(3)
+    for _ in range(2000):
+        result = detect_fraud({
+            "transaction_amount": rng.uniform(0, 100000),
+            "transaction_frequency": rng.randint(0, 30),
+            "social_trust_score": rng.uniform(0, 100),
+            "account_age": rng.uniform(0, 5),
+            "fraud_complaints_count": rng.randint(0, 5),
+            "recipient_blacklist_status": rng.randint(0, 1),
+            "vpn_proxy_usage": rng.randint(0, 1),
+            "high_risk_transaction_times": rng.randint(0, 1),
+        })
+        fraudulent = result["probability"] >= shadow_scoring.DECISION_THRESHOLD
+        assert fraudulent == (result["prediction"] == "Fraudulent"), result
+    print(f"   Threshold {shadow_scoring.DECISION_THRESHOLD} matches detect_fraud on 2000 payloads")
+
+    # Test 2: Batch scoring and counters; a copy of the served scorer never disagrees
+    print("\n2. Testing batch scoring...")
+    scorer = shadow_scoring.ShadowScorer(queue_size=8, batch_size=4, shadow_dir=shadow_dir)
+    calls = []
+
+    def served_copy(vectors):
+        calls.append(len(vectors))
+        return [v[0] for v in vectors]
+
+    scorer.register_candidate("served_copy", served_copy)
+    scorer.register_candidate("always_fraud", lambda vectors: [0.99] * len(vectors), threshold=0.5)
+    batch = [(f"t{i}", [p], p, "Fraudulent" if p >= 0.65 else "Legitimate")
+             for i, p in enumerate([0.1, 0.55, 0.6, 0.9])]
+    scorer.score_batch(batch)
+    stats = scorer.snapshot()["candidates"]
+    print(f"   served_copy: {stats['served_copy']['disagreements']} disagreements, "
+          f"always_fraud: {stats['always_fraud']['disagreements']}")
+    assert calls == [4]
+    assert stats["served_copy"]["scored"] == 4 and stats["served_copy"]["disagreements"] == 0
+    assert stats["always_fraud"]["disagreements"] == 3 and stats["always_fraud"]["threshold"] == 0.5
+    with open(os.path.join(shadow_dir, f"disagreements-{os.getpid()}.jsonl")) as f:
+        records = [json.loads(line) for line in f]
+    assert {r["id"] for r in records} == {"t0", "t1", "t2"}
+
+    # Test 3: A full queue drops instead of blocking
+    print("\n3. Testing drop-on-full...")
+    scorer._ensure_worker = lambda: None  # no consumer: let the queue fill
+    scorer._queue = queue.Queue(maxsize=8)
+    accepted = [scorer.submit(f"q{i}", [0.1], 0.1, "Legitimate") for i in range(12)]
+    snapshot = scorer.snapshot()
+    print(f"   Enqueued {snapshot['enqueued']}, dropped {snapshot['dropped']}")
+    assert accepted.count(True) == 8 and snapshot["dropped"] == 4
+
+    # Test 4: Disagreement files rotate at the size cap
+    print("\n4. Testing file rotation...")
+    capped = shadow_scoring.ShadowScorer(shadow_dir=shadow_dir, max_file_bytes=1024)
+    for i in range(50):
+        capped._write([{"id": i, "features": [0.0] * 20}])
+    path = os.path.join(shadow_dir, f"disagreements-{os.getpid()}.jsonl")
+    sizes = os.path.getsize(path), os.path.getsize(path + ".1")
+    print(f"   Current / rotated sizes: {sizes}")
+    assert max(sizes) < 1024 + 200
+
+    print("\n" + "=" * 60)
+    print("Shadow Scoring Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_shadow_scoring()
@@ -0,0 +1,99 @@
+"""
+Test script for hash-sharded transaction storage
+"""
+
+import os
+import random
+import tempfile
+import database as db
+import fraud_rings
+
+def make_transactions(n=300):
+    rng = random.Random(3)
+    accounts = [f"acct-{i}" for i in range(25)]
+    return [{
+        "id": f"txn-{i}",
+        "from_account": rng.choice(accounts),
+        "to_account": rng.choice(accounts),
+        "transaction_amount": rng.randint(1, 500),
+        "prediction": rng.choice(["Legitimate", "Legitimate", "Fraudulent"]),
+        "timestamp": f"2026-10-{1 + i % 28:02d}T{rng.randint(0, 23):02d}:00:00",
+    } for i in range(n)]
+
+def snapshot_queries():
+    """Everything the API reads, for comparing storage layouts"""
+    page = db.get_account_transactions("acct-3", role="both", limit=7)
+    second = db.get_account_transactions("acct-3", role="both", cursor=page["next_cursor"], limit=7)
+    return {
+        "recent": [r["id"] for r in db.get_transactions(limit=20, offset=5)],
+        "frauds": [r["id"] for r in db.get_transactions(prediction_filter="Fraudulent", limit=10)],
+        "stats": db.get_transaction_stats(),
+        "pages": [r["id"] for r in page["transactions"] + second["transactions"]],
+        "sent": [r["id"] for r in db.get_account_transactions("acct-3", role="sender", limit=50)["transactions"]],
+        "summary": db.get_account_summary("acct-3"),
+        # Non-positive limits are clamped to a one-row page
+        "clamped": [r["id"] for r in db.get_account_transactions("acct-3", limit=-1)["transactions"]],
+    }
+
+def test_sharding():
+    print("=" * 60)
+    print("Testing Sharded Storage")
+    print("=" * 60)
+
+    original_path, original_shards = db.DB_PATH, db.SHARDS
+    transactions = make_transactions()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            # Reference answers from a single database file
+            db.SHARDS = 0
+            db.DB_PATH = os.path.join(tmp, "single.db")
+            db.init_db()
+            db.save_transactions(transactions)
+            expected = snapshot_queries()
+            assert expected["clamped"] == expected["pages"][:1]
+
+            # Test 1: Same answers with four shards
+            print("\n1. Testing fan-out queries against a single database...")
+            db.SHARDS = 4
+            db.DB_PATH = os.path.join(tmp, "sharded.db")
+            db.init_db()
+            assert db.reshard(os.path.join(tmp, "single.db")) == len(transactions)
+            counts = [db.query("SELECT COUNT(*) AS c FROM transactions", one=True, shard=s)["c"]
+                      for s in db.transaction_shards()]
+            print(f"   Rows per shard: {counts}")
+            assert sum(counts) == len(transactions) and min(counts) > 0
+            actual = snapshot_queries()
+            for key in expected:
+                assert actual[key] == expected[key], key
+            print(f"   Stats: {actual['stats']}")
+
+            # Test 2: Tagged ids go to the owning shard
+            print("\n2. Testing id routing...")
+            txn_id = db.new_transaction_id("acct-7")
+            assert db.shard_of_id(txn_id) == db.shard_for("acct-7")
+            assert len({db.new_transaction_id("acct-7") for _ in range(1000)}) == 1000
+            db.save_transaction({"id": txn_id, "from_account": "acct-7", "to_account": "acct-1",
+                                 "timestamp": "2026-10-30T00:00:00"})
+            owner = db.query("SELECT COUNT(*) AS c FROM transactions WHERE id = ?", (txn_id,),
+                             one=True, shard=db.shard_for("acct-7"))["c"]
+            print(f"   {txn_id} -> shard {db.shard_of_id(txn_id)}")
+            assert owner == 1 and db.get_transaction_by_id(txn_id)["from_account"] == "acct-7"
+            assert db.get_transaction_by_id("txn-42")["id"] == "txn-42"  # untagged: fan-out
+            assert db.delete_transaction(txn_id) == 1 and db.get_transaction_by_id(txn_id) is None
+
+            # Test 3: The ring index follows every shard
+            print("\n3. Testing per-shard watermarks...")
+            rings = fraud_rings.FraudRingIndex(snapshot_path=os.path.join(tmp, "rings.snapshot")).start()
+            print(f"   {rings.stats()}")
+            assert sum(rings.stats()["watermarks"]) == len(transactions)
+            assert rings.component("acct-3")["transactions"] == len(transactions)
+        finally:
+            db.close_db()
+            db.DB_PATH, db.SHARDS = original_path, original_shards
+
+    print("\n" + "=" * 60)
+    print("Sharding Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_sharding()
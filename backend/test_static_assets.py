@@ -0,0 +1,76 @@
+"""
+Test script for the in-memory static asset manifest
+"""
+
+import gzip
+import os
+import tempfile
+import app as backend
+import static_assets
+
+def test_static_assets():
+    print("=" * 60)
+    print("Testing Static Assets")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as dist:
+        script = b"console.log('fraudguard');\n" * 200
+        with open(os.path.join(dist, "app.js"), "wb") as f:
+            f.write(script)
+        with open(os.path.join(dist, "styles.css"), "wb") as f:
+            f.write(b"body{margin:0}")
+        with open(os.path.join(dist, "index.html"), "w", encoding="utf-8") as f:
+            f.write('<link href="./styles.css"><script src="app.js"></script>'
+                    '<a href="app.jsx">not an asset</a>')
+
+        original = backend.asset_manifest
+        backend.asset_manifest = static_assets.AssetManifest(dist)
+        client = backend.app.test_client()
+        try:
+            # Test 1: index.html references the hashed, immutable names
+            print("\n1. Testing index.html rewrite...")
+            manifest = backend.asset_manifest.load()
+            js, css = manifest.assets["app.js"], manifest.assets["styles.css"]
+            index = client.get("/").get_data(as_text=True)
+            print(f"   {index}")
+            assert f'src="app.{js.digest}.js"' in index
+            assert f'href="./styles.{css.digest}.css"' in index
+            assert 'href="app.jsx"' in index
+            hashed = client.get(f"/app.{js.digest}.js")
+            assert hashed.headers["Cache-Control"] == static_assets.IMMUTABLE_CACHE
+            assert client.get("/").headers["Cache-Control"] == static_assets.REVALIDATE_CACHE
+            assert client.get("/dashboard/settings").get_data(as_text=True) == index
+
+            # Test 2: Accept-Encoding picks a variant, q=0 refuses one
+            print("\n2. Testing content negotiation...")
+            gz = client.get("/app.js", headers={"Accept-Encoding": "gzip, deflate"})
+            assert gz.headers["Content-Encoding"] == "gzip"
+            assert gzip.decompress(gz.get_data()) == script
+            refused = client.get("/app.js", headers={"Accept-Encoding": "gzip;q=0, identity"})
+            assert "Content-Encoding" not in refused.headers and refused.get_data() == script
+            small = client.get("/styles.css", headers={"Accept-Encoding": "gzip"})
+            assert "Content-Encoding" not in small.headers  # below MIN_COMPRESS_BYTES
+            print(f"   gzip {len(gz.get_data())} bytes, identity {len(refused.get_data())} bytes")
+
+            # Test 3: ETag revalidation per representation
+            print("\n3. Testing ETag / 304...")
+            assert gz.headers["ETag"] != refused.headers["ETag"]
+            assert gz.headers["Vary"] == "Accept-Encoding"
+            not_modified = client.get("/app.js", headers={"Accept-Encoding": "gzip",
+                                                         "If-None-Match": gz.headers["ETag"]})
+            assert not_modified.status_code == 304 and not not_modified.get_data()
+            weak = client.get("/app.js", headers={"If-None-Match": f'"x", W/{refused.headers["ETag"]}'})
+            assert weak.status_code == 304
+            # The gzip tag does not validate the identity body
+            stale = client.get("/app.js", headers={"If-None-Match": gz.headers["ETag"]})
+            assert stale.status_code == 200 and stale.get_data() == script
+            print(f"   304 for {gz.headers['ETag']}, 200 for a mismatched encoding")
+        finally:
+            backend.asset_manifest = original
+
+    print("\n" + "=" * 60)
+    print("Static Asset Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_static_assets()
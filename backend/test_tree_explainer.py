@@ -0,0 +1,121 @@
+"""
+Test script for the TreeSHAP explainer
+"""
+
+import itertools
+import math
+import numpy as np
+import model_artifact
+import tree_explainer
+from tree_explainer import TreeExplainer
+
+N_FEATURES = 4
+
+def random_forest_arrays(rng, n_trees=5, depth=4):
+    """Flattened forest of random full trees that reuse features along paths"""
+    arrays = {name: [] for name in model_artifact.ARRAYS}
+    for _ in range(n_trees):
+        arrays["roots"].append(len(arrays["left"]))
+        def grow(level):
+            node = len(arrays["left"])
+            for name in ("left", "right", "feature", "threshold", "value", "cover"):
+                arrays[name].append(0)
+            if level == depth:
+                arrays["left"][node] = arrays["right"][node] = -1
+                arrays["feature"][node] = -2
+                arrays["value"][node] = rng.random()
+                arrays["cover"][node] = rng.integers(1, 20)
+                return node
+            arrays["feature"][node] = rng.integers(N_FEATURES)
+            arrays["threshold"][node] = rng.random()
+            arrays["left"][node] = grow(level + 1)
+            arrays["right"][node] = grow(level + 1)
+            arrays["cover"][node] = arrays["cover"][arrays["left"][node]] + arrays["cover"][arrays["right"][node]]
+            return node
+        grow(0)
+    arrays = {name: np.asarray(values) for name, values in arrays.items()}
+    meta = {"version": "test", "feature_names": [f"f{i}" for i in range(N_FEATURES)], "max_depth": depth}
+    return model_artifact.ForestArtifact.from_arrays(arrays, meta)
+
+def conditional_expectation(forest, x, subset):
+    """E[f(x) | x_S] with unknown features averaged by cover (path-dependent game)"""
+    def walk(node):
+        if forest.left[node] < 0:
+            return forest.value[node]
+        left, right = forest.left[node], forest.right[node]
+        f = forest.feature[node]
+        if f in subset:
+            return walk(left if x[f] <= forest.threshold[node] else right)
+        return (walk(left) * forest.cover[left] + walk(right) * forest.cover[right]) / forest.cover[node]
+    return np.mean([walk(root) for root in forest.roots])
+
+def brute_force_shap(forest, x):
+    phi = np.zeros(N_FEATURES)
+    for j in range(N_FEATURES):
+        others = [k for k in range(N_FEATURES) if k != j]
+        for size in range(N_FEATURES):
+            weight = math.factorial(size) * math.factorial(N_FEATURES - size - 1) / math.factorial(N_FEATURES)
+            for subset in itertools.combinations(others, size):
+                phi[j] += weight * (conditional_expectation(forest, x, set(subset) | {j})
+                                    - conditional_expectation(forest, x, set(subset)))
+    return phi
+
+def test_tree_explainer():
+    print("=" * 60)
+    print("Testing TreeSHAP Explainer")
+    print("=" * 60)
+
+    rng = np.random.default_rng(7)
+    forest = random_forest_arrays(rng)
+    explainer = TreeExplainer(forest, forest.feature_names)
+    X = rng.random((6, N_FEATURES)).astype(np.float32).astype(np.float64)
+
+    # Test 1: Exact Shapley values of the path-dependent game
+    print("\n1. Testing against brute-force Shapley values...")
+    phi = explainer.shap_values(X)
+    for x, row in zip(X, phi):
+        expected = brute_force_shap(forest, x)
+        assert np.allclose(row, expected, atol=1e-12), (row, expected)
+    print(f"   {len(X)} rows match")
+
+    # Test 2: Local accuracy (base value + contributions = prediction)
+    print("\n2. Testing additivity...")
+    assert np.isclose(explainer.expected_value, conditional_expectation(forest, X[0], set()))
+    assert np.allclose(phi.sum(axis=1) + explainer.expected_value, forest.predict_proba(X))
+    print(f"   Base value: {explainer.expected_value:.4f}")
+
+    # Test 3: Single-row and batch explanations agree
+    print("\n3. Testing explain vs explain_batch...")
+    single = explainer.explain(X[0], top_k=2)
+    batch = explainer.explain_batch(X, top_k=2)
+    print(f"   {single}")
+    assert single == batch[0]
+    assert len(single["factors"]) <= 2
+    assert all(f["contribution"] > 0 for f in single["factors"])
+
+    # Test 4: Factors are labelled by the row's value, not just the feature
+    print("\n4. Testing value-aware factor labels...")
+    explainer.feature_names = ["high_risk_transaction_times", "vpn_proxy_usage", "account_age", "f3"]
+    factors = explainer._factors(np.array([0.0, 1.0, 5.0, 0.0]), np.array([0.4, 0.3, 0.2, 0.1]), top_k=4)
+    labels = [f["factor"] for f in factors]
+    print(f"   {labels}")
+    assert labels == ["Transaction time", "VPN or proxy detected", "Account age", "f3"]
+
+    # Test 5: Forests too deep to tabulate are refused up front
+    print("\n5. Testing the path depth limit...")
+    original_depth = tree_explainer.MAX_PATH_FEATURES
+    tree_explainer.MAX_PATH_FEATURES = 2
+    try:
+        TreeExplainer(forest, forest.feature_names)
+        raise AssertionError("explainer built past MAX_PATH_FEATURES")
+    except ValueError as e:
+        print(f"   Refused: {e}")
+    finally:
+        tree_explainer.MAX_PATH_FEATURES = original_depth
+
+    print("\n" + "=" * 60)
+    print("Explainer Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_tree_explainer()
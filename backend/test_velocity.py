@@ -0,0 +1,86 @@
+"""
+Test script for the HyperLogLog velocity index
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+import database as db
+import velocity
+
+def test_velocity():
+    print("=" * 60)
+    print("Testing Velocity Sketches")
+    print("=" * 60)
+
+    # Test 1: Estimates stay within a few standard errors once dense
+    print("\n1. Testing HyperLogLog accuracy...")
+    for n in (10, 500, 20000):
+        sketch = velocity.HyperLogLog()
+        for i in range(n):
+            sketch.add(velocity.hash64(f"acct-{i}"))
+        count = velocity.estimate([sketch])
+        print(f"   {n} distinct -> {count} ({'sparse' if sketch.registers is None else 'dense'})")
+        if sketch.registers is None:
+            assert count == n
+        else:
+            assert abs(count - n) / n < 0.1
+
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "velocity.db")
+        db.init_db()
+        try:
+            # Test 2: Window merge over buckets, duplicates counted once
+            print("\n2. Testing windowed distinct counts...")
+            now = time.time()
+            stamp = lambda hours_ago: datetime.fromtimestamp(now - hours_ago * 3600, timezone.utc).isoformat()
+            rows = [("sender", f"r{i % 12}", "dev-1", stamp(i % 20)) for i in range(40)]
+            rows += [("sender", "r-old", "dev-1", stamp(30))]
+            rows += [(f"mule{i}", "x", "dev-1", stamp(1)) for i in range(4)]
+            for i, (src, dst, device, ts) in enumerate(rows):
+                db.save_transaction({"id": f"vel-{i}", "from_account": src, "to_account": dst,
+                                     "device_id": device, "timestamp": ts, "prediction": "Legitimate"})
+            index = velocity.VelocityIndex(snapshot_path=os.path.join(tmp, "velocity.snapshot")).start()
+            features = index.scorer_features("sender", "dev-1")
+            print(f"   {features}")
+            assert features == {"sender_distinct_recipients_24h": 12, "device_distinct_accounts_24h": 5}
+
+            # Test 3: Snapshot restore + tail replay
+            print("\n3. Testing snapshot restore...")
+            db.save_transaction({"id": "vel-late", "from_account": "sender", "to_account": "r-new",
+                                 "device_id": "dev-1", "timestamp": stamp(0)})
+            restored = velocity.VelocityIndex(snapshot_path=index.snapshot_path).start()
+            assert restored.distinct(velocity.RECIPIENTS, "sender") == 13
+
+            # A delete lets SQLite reuse the rowid; the index must start over, not skip the row
+            db.delete_transaction("vel-late")
+            db.save_transaction({"id": "vel-reused", "from_account": "fresh", "to_account": "r-1",
+                                 "timestamp": stamp(0)})
+            restored.catch_up()
+            assert restored.distinct(velocity.RECIPIENTS, "sender") == 12
+            assert restored.distinct(velocity.RECIPIENTS, "fresh") == 1
+
+            # Test 4: Memory cap evicts the least recently touched keys
+            print("\n4. Testing idle-key eviction...")
+            small = velocity.VelocityIndex(snapshot_path=os.path.join(tmp, "small.snapshot"), max_bytes=2000)
+            small.catch_up()
+            for i in range(50):
+                small.add_transaction({"from_account": f"a{i}", "to_account": "b", "timestamp": stamp(0)})
+                small.distinct(velocity.RECIPIENTS, "a0")  # keep a0 hot
+            stats = small.stats()
+            print(f"   {stats}")
+            assert stats["bytes"] <= 2000 and stats["evicted"] > 0
+            assert small.distinct(velocity.RECIPIENTS, "a0") == 1
+            assert small.distinct(velocity.RECIPIENTS, "a1") == 0
+        finally:
+            db.close_db()
+            db.DB_PATH = original_path
+
+    print("\n" + "=" * 60)
+    print("Velocity Tests Completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    test_velocity()
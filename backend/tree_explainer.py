@@ -0,0 +1,284 @@
+"""
+Per-prediction explanations for the fraud forest
+Exact path-dependent TreeSHAP (Lundberg et al.) over the flattened tree
+arrays of model_artifact, evaluated with a precomputed lookup table so a
+row costs a few vectorised NumPy passes over all trees at once.
+
+For one leaf with unique path features U (|U| = d), zero fractions z_k
+(product of cover ratios along the path) and one fractions o_k (1 if x
+follows every split on k, else 0), the leaf adds to feature j:
+
+    v_leaf * (o_j - z_j) * sum_{S subset U-{j}} |S|!(d-|S|-1)!/d!
+                           * prod_{k in S} o_k * prod_{k not in S+{j}} z_k
+
+Only the 2**d bit patterns of o are possible, so every leaf's
+contributions are tabulated once at build time. Explaining a row is then:
+evaluate each split, AND them into o per (leaf, feature) slot, turn the
+bits into a pattern per leaf, gather from the table and sum per feature.
+Forests whose paths are too deep for the table (MAX_PATH_FEATURES,
+MAX_TABLE_MB) are refused with ValueError at build time.
+
+Batch audit of stored transactions:
+    python tree_explainer.py audit [limit]
+"""
+
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# (is_risky(value), wording of fraud_detector.detect_fraud, neutral wording).
+# A factor is labelled by the row's value: SHAP can push a benign value
+# (e.g. a daytime transaction) towards fraud through interactions, and
+# "Transaction at high-risk time" would then misdescribe the row.
+FEATURE_LABELS = {
+    "transaction_amount": (lambda v: v > 2500, "High transaction amount", "Transaction amount"),
+    "transaction_frequency": (lambda v: v > 10, "High transaction frequency", "Transaction frequency"),
+    "behavioral_biometrics": (lambda v: v > 2.0, "Unusual behavioral pattern", "Behavioral pattern"),
+    "time_since_last_transaction": (lambda v: v < 2.0, "Very short time since last transaction",
+                                    "Time since last transaction"),
+    "social_trust_score": (lambda v: v < 50, "Low social trust score", "Social trust score"),
+    "account_age": (lambda v: v < 1.0, "Very new account", "Account age"),
+    "normalized_transaction_amount": (lambda v: v > 0.6, "Unusually high normalized amount",
+                                      "Normalized transaction amount"),
+    "transaction_context_anomalies": (lambda v: v > 1.5, "High contextual anomalies", "Transaction context"),
+    "fraud_complaints_count": (lambda v: v > 0, "Previous fraud complaints", "Fraud complaint history"),
+    "recipient_blacklist_status": (lambda v: v == 1, "Recipient is on blacklist", "Recipient blacklist status"),
+    "device_fingerprinting": (lambda v: v == 1, "Suspicious device detected", "Device fingerprint"),
+    "vpn_proxy_usage": (lambda v: v == 1, "VPN or proxy detected", "VPN or proxy usage"),
+    "high_risk_transaction_times": (lambda v: v == 1, "Transaction at high-risk time", "Transaction time"),
+    "past_fraudulent_behavior": (lambda v: v == 1, "History of fraudulent activity", "Account history"),
+    "location_inconsistent": (lambda v: v == 1, "Location inconsistency detected", "Location consistency"),
+    "merchant_category_mismatch": (lambda v: v == 1, "Merchant category mismatch", "Merchant category"),
+    "user_daily_limit_exceeded": (lambda v: v == 1, "Daily transaction limit exceeded", "Daily transaction limit"),
+    "recent_high_value_flags": (lambda v: v == 1, "Recent high-value transaction flags",
+                                "Recent high-value activity"),
+}
+
+# One-hot columns are reported as one factor, labelled by the row's actual category
+CATEGORICAL_GROUPS = {
+    "recipient_verification_status": (
+        ["recipient_verification_status_suspicious", "recipient_verification_status_verified"],
+        lambda x: ("Recipient marked as suspicious" if x[0] else
+                   "Recipient verification status" if x[1] else
+                   "Recipient recently registered"),
+    ),
+    "geo_location_flags": (
+        ["geo_location_flags_normal", "geo_location_flags_unusual"],
+        lambda x: ("Unusual geographic location" if x[1] else
+                   "Geographic location" if x[0] else
+                   "High-risk geographic location"),
+    ),
+}
+
+ROW_CHUNK = 256
+# The lookup table holds 2**d * d entries per leaf (d = distinct features on
+# its path); refuse forests that would not fit instead of exhausting memory
+MAX_PATH_FEATURES = int(os.getenv("FRAUDGUARD_EXPLAIN_MAX_DEPTH", "16"))
+MAX_TABLE_MB = float(os.getenv("FRAUDGUARD_EXPLAIN_MAX_TABLE_MB", "512"))
+
+
+class TreeExplainer:
+    """Exact path-dependent TreeSHAP for a flattened forest (mean of tree outputs)"""
+
+    def __init__(self, forest, feature_names):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        left = np.asarray(forest.left)
+        right = np.asarray(forest.right)
+        feature = np.asarray(forest.feature)
+        threshold = np.asarray(forest.threshold)
+        value = np.asarray(forest.value)
+        cover = np.asarray(forest.cover)
+        roots = np.asarray(forest.roots)
+        n_trees = len(roots)
+
+        edge_feature, edge_threshold, edge_left, edge_slot = [], [], [], []
+        slot_feature, slot_leaf, slot_bit = [], [], []
+        leaves = []  # (scaled leaf value, zero fractions per unique feature)
+        expected = 0.0
+
+        for root in roots:
+            stack = [(int(root), [])]
+            while stack:
+                node, path = stack.pop()
+                if left[node] < 0:
+                    expected += value[node] * cover[node] / cover[root]
+                    merged = {}
+                    for f, t, go_left, z in path:
+                        merged.setdefault(f, []).append((t, go_left, z))
+                    leaf_id = len(leaves)
+                    zeros = []
+                    for bit, (f, splits) in enumerate(merged.items()):
+                        slot = len(slot_feature)
+                        slot_feature.append(f)
+                        slot_leaf.append(leaf_id)
+                        slot_bit.append(bit)
+                        zeros.append(math.prod(z for _, _, z in splits))
+                        for t, go_left, _ in splits:
+                            edge_feature.append(f)
+                            edge_threshold.append(t)
+                            edge_left.append(go_left)
+                            edge_slot.append(slot)
+                    leaves.append((value[node] / n_trees, zeros))
+                    continue
+                f, t = int(feature[node]), float(threshold[node])
+                for child, go_left in ((left[node], True), (right[node], False)):
+                    z = cover[child] / cover[node]
+                    stack.append((int(child), path + [(f, t, go_left, z)]))
+
+        self.expected_value = expected / n_trees
+        self._edge_feature = np.asarray(edge_feature, dtype=np.int64)
+        self._edge_threshold = np.asarray(edge_threshold, dtype=np.float64)
+        self._edge_left = np.asarray(edge_left, dtype=bool)
+        self._edge_slot = np.asarray(edge_slot, dtype=np.int64)
+        self._slot_feature = np.asarray(slot_feature, dtype=np.int64)
+        self._slot_leaf = np.asarray(slot_leaf, dtype=np.int64)
+        self._slot_weight = (1 << np.asarray(slot_bit, dtype=np.int64))
+        self._n_slots = len(slot_feature)
+        self._n_leaves = len(leaves)
+        # Edges are contiguous per slot and slots per leaf, so both ANDs are one reduceat
+        self._slot_start = np.flatnonzero(np.r_[True, np.diff(self._edge_slot) != 0])
+        new_leaf = np.r_[True, np.diff(self._slot_leaf) != 0]
+        self._leaf_start = np.flatnonzero(new_leaf)
+        self._slot_group = np.cumsum(new_leaf) - 1  # leaves without splits have no slots
+        self._build_table(leaves, slot_bit)
+
+    def _build_table(self, leaves, slot_bit):
+        """contribution[leaf, pattern, j] for every leaf, flattened with per-leaf offsets"""
+        depths = np.asarray([len(z) for _, z in leaves], dtype=np.int64)
+        depth = int(depths.max()) if len(depths) else 0
+        if depth > MAX_PATH_FEATURES:
+            raise ValueError(f"a leaf path uses {depth} distinct features (limit {MAX_PATH_FEATURES})")
+        sizes = (1 << depths) * depths
+        table_mb = int(sizes.sum()) * 8 / 2**20
+        if table_mb > MAX_TABLE_MB:
+            raise ValueError(f"explanation table would take {table_mb:.0f} MB (limit {MAX_TABLE_MB:g})")
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        table = np.zeros(int(sizes.sum()))
+
+        for d in np.unique(depths):
+            d = int(d)
+            if d == 0:
+                continue
+            ids = np.nonzero(depths == d)[0]
+            v = np.asarray([leaves[i][0] for i in ids])                 # (L,)
+            z = np.asarray([leaves[i][1] for i in ids])                 # (L, d)
+            patterns = (np.arange(1 << d)[:, None] >> np.arange(d)) & 1  # (P, d)
+            o = patterns[None, :, :].astype(np.float64)                 # (1, P, d)
+            zb = z[:, None, :]                                          # (L, 1, d)
+            weights = np.asarray([math.factorial(s) * math.factorial(d - s - 1) / math.factorial(d)
+                                  for s in range(d)])
+            block = np.empty((len(ids), 1 << d, d))
+            for j in range(d):
+                # Coefficients of prod_{k != j} (z_k + o_k * t), indexed by |S|
+                coeffs = np.zeros((len(ids), 1 << d, d))
+                coeffs[..., 0] = 1.0
+                for k in range(d):
+                    if k == j:
+                        continue
+                    shifted = np.zeros_like(coeffs)
+                    shifted[..., 1:] = coeffs[..., :-1] * o[..., k:k + 1]
+                    coeffs = coeffs * zb[..., k:k + 1] + shifted
+                block[..., j] = (o[..., j] - zb[..., j]) * (coeffs @ weights)
+            block *= v[:, None, None]
+            for row, leaf in enumerate(ids):
+                table[offsets[leaf]:offsets[leaf] + sizes[leaf]] = block[row].ravel()
+
+        self._table = table
+        # Table index of a slot = its leaf's offset + bit, plus pattern * leaf depth
+        leaf = self._slot_leaf
+        self._slot_base = offsets[leaf] + np.asarray(slot_bit, dtype=np.int64)
+        self._slot_stride = depths[leaf]
+
+    def shap_values(self, X):
+        """SHAP values per row and feature, shape (n_rows, n_features)"""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((X.shape[0], self.n_features))
+        for start in range(0, X.shape[0], ROW_CHUNK):
+            out[start:start + ROW_CHUNK] = self._shap_chunk(X[start:start + ROW_CHUNK])
+        return out
+
+    def _shap_chunk(self, X):
+        follows = (X[:, self._edge_feature] <= self._edge_threshold) == self._edge_left  # (n, E)
+        ones = np.logical_and.reduceat(follows, self._slot_start, axis=1)                 # (n, S)
+        patterns = np.add.reduceat(ones * self._slot_weight, self._leaf_start, axis=1)    # (n, L)
+        index = self._slot_base + patterns[:, self._slot_group] * self._slot_stride
+        contributions = self._table[index]                                                # (n, S)
+        # Per-feature sums: offset each row's slots into its own block of features
+        bins = (np.arange(len(X)) * self.n_features)[:, None] + self._slot_feature
+        totals = np.bincount(bins.ravel(), weights=contributions.ravel(),
+                             minlength=len(X) * self.n_features)
+        return totals.reshape(len(X), self.n_features)
+
+    # ------------------------------
+    # Human-readable factors
+    # ------------------------------
+    def _factors(self, x, phi, top_k):
+        contributions = []
+        grouped = set()
+        for group, (columns, label) in CATEGORICAL_GROUPS.items():
+            idx = [self.feature_names.index(c) for c in columns if c in self.feature_names]
+            if len(idx) != len(columns):
+                continue
+            grouped.update(idx)
+            contributions.append((float(phi[idx].sum()), group, label([x[i] for i in idx])))
+        for i, name in enumerate(self.feature_names):
+            if i in grouped:
+                continue
+            label = name
+            if name in FEATURE_LABELS:
+                is_risky, risky, neutral = FEATURE_LABELS[name]
+                label = risky if is_risky(x[i]) else neutral
+            contributions.append((float(phi[i]), name, label))
+        contributions.sort(key=lambda c: c[0], reverse=True)
+        return [
+            {"factor": label, "feature": name, "contribution": round(value, 4)}
+            for value, name, label in contributions[:top_k] if value > 0
+        ]
+
+    def explain(self, x, top_k=3):
+        """Top-k features pushing one row towards fraud"""
+        x = np.asarray(x, dtype=np.float64)
+        phi = self.shap_values(x)[0]
+        return {
+            "base_value": round(self.expected_value, 4),
+            "probability": round(self.expected_value + float(phi.sum()), 4),
+            "factors": self._factors(x, phi, top_k),
+        }
+
+    def explain_batch(self, X, top_k=3):
+        """explain() for many rows with one vectorised SHAP pass per chunk"""
+        X = np.asarray(X, dtype=np.float64)
+        phis = self.shap_values(X)
+        return [
+            {
+                "base_value": round(self.expected_value, 4),
+                "probability": round(self.expected_value + float(phi.sum()), 4),
+                "factors": self._factors(x, phi, top_k),
+            }
+            for x, phi in zip(X, phis)
+        ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "audit":
+        import database as db
+        import model_service
+
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        explainer = model_service.get_explainer() if model_service.load_model() else None
+        if explainer is None:
+            print("❌ No tree model available to explain")
+            sys.exit(1)
+        rows = db.get_all_transactions(limit)
+        vectors = [model_service.build_feature_vector(r) for r in rows]
+        for row, explanation in zip(rows, explainer.explain_batch(vectors)):
+            print(json.dumps({"id": row["id"], "prediction": row["prediction"], **explanation}))
+    else:
+        print(__doc__)
+        sys.exit(1)
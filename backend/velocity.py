@@ -0,0 +1,272 @@
+"""
+Distinct-count velocity features for FraudGuard AI
+HyperLogLog sketches per key in time buckets, merged on read into a
+sliding window: "distinct recipients this account paid in 24h" and
+"distinct sending accounts seen on this device in 24h".
+
+Small sketches stay sparse (the raw 64-bit hashes, exact) and switch to
+2**PRECISION one-byte registers once that is smaller. Memory is capped;
+the least recently touched keys are evicted first. The sketches are folded
+from the transactions table (see table_follower.RowidIndex); re-applying
+a row is harmless because adding a value to a HyperLogLog twice is a no-op.
+"""
+
+import hashlib
+import math
+import os
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from table_follower import RowidIndex
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PATH = os.getenv("FRAUDGUARD_VELOCITY_SNAPSHOT", os.path.join(BASE_DIR, "velocity.snapshot"))
+SNAPSHOT_INTERVAL_S = float(os.getenv("FRAUDGUARD_VELOCITY_SNAPSHOT_S", "300"))
+CATCH_UP_INTERVAL_S = float(os.getenv("FRAUDGUARD_VELOCITY_CATCH_UP_S", "1.0"))
+WINDOW_S = int(os.getenv("FRAUDGUARD_VELOCITY_WINDOW_S", str(24 * 3600)))
+BUCKET_S = int(os.getenv("FRAUDGUARD_VELOCITY_BUCKET_S", "3600"))
+MAX_BYTES = int(float(os.getenv("FRAUDGUARD_VELOCITY_MAX_MB", "64")) * 1024 * 1024)
+PRECISION = 10  # 1024 registers, ~3.3% standard error
+SNAPSHOT_VERSION = 3
+
+# Sketch families: (key column, counted column)
+RECIPIENTS = "recipients"  # from_account -> distinct to_account
+DEVICES = "devices"        # device_id -> distinct from_account
+FAMILIES = {RECIPIENTS: ("from_account", "to_account"), DEVICES: ("device_id", "from_account")}
+
+SKETCH_OVERHEAD = 64  # rough per-object bookkeeping, for the memory cap
+
+
+def hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """One bucket's sketch: sparse hash list until dense registers are smaller"""
+
+    __slots__ = ("hashes", "registers")
+
+    def __init__(self):
+        self.hashes = array("Q")
+        self.registers = None
+
+    @staticmethod
+    def position(h, precision=PRECISION):
+        """(register index, rank of the first set bit) for a 64-bit hash"""
+        rest_bits = 64 - precision
+        rest = h & ((1 << rest_bits) - 1)
+        return h >> rest_bits, rest_bits - rest.bit_length() + 1
+
+    def add(self, h, precision=PRECISION):
+        """Returns the change in size (bytes)"""
+        if self.registers is not None:
+            index, rank = self.position(h, precision)
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+            return 0
+        if h in self.hashes:
+            return 0
+        self.hashes.append(h)
+        if len(self.hashes) * 8 < (1 << precision):
+            return 8
+        before = self.nbytes()
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        for stored in self.hashes:
+            index, rank = self.position(stored, precision)
+            self.registers[index] = max(self.registers[index], rank)
+        self.hashes = array("Q")
+        return self.nbytes() - before + 8
+
+    def nbytes(self):
+        return SKETCH_OVERHEAD + (len(self.registers) if self.registers is not None else 8 * len(self.hashes))
+
+
+def estimate(sketches, precision=PRECISION):
+    """Distinct count of the union of several bucket sketches"""
+    dense = [s.registers for s in sketches if s.registers is not None]
+    if not dense:
+        # All sparse: the union is exact
+        return len(set().union(*(s.hashes for s in sketches)))
+    registers = np.maximum.reduce(dense) if len(dense) > 1 else dense[0].copy()
+    for s in sketches:
+        for h in s.hashes:
+            index, rank = HyperLogLog.position(h, precision)
+            if rank > registers[index]:
+                registers[index] = rank
+    m = 1 << precision
+    raw = 0.7213 / (1 + 1.079 / m) * m * m / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return round(m * math.log(m / zeros))  # linear counting for small cardinalities
+    return round(raw)
+
+
+def _epoch(timestamp):
+    """Seconds since the epoch for a stored timestamp (naive ISO strings are UTC)"""
+    if not timestamp:
+        return time.time()
+    try:
+        parsed = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+    except ValueError:
+        return time.time()
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class VelocityIndex(RowidIndex):
+    """Windowed distinct counts per (family, key), LRU-bounded in memory"""
+
+    COLUMNS = ("from_account", "to_account", "device_id", "timestamp")
+    SNAPSHOT_VERSION = SNAPSHOT_VERSION
+    LOG_TAG = "VELOCITY"
+
+    def __init__(self, snapshot_path=SNAPSHOT_PATH, window_s=WINDOW_S, bucket_s=BUCKET_S,
+                 max_bytes=MAX_BYTES):
+        self.window_s = window_s
+        self.bucket_s = bucket_s
+        self.max_bytes = max_bytes
+        super().__init__(snapshot_path, CATCH_UP_INTERVAL_S, SNAPSHOT_INTERVAL_S)
+
+    def _clear(self):
+        # (family, key) -> {bucket: HyperLogLog}, least recently touched first
+        self._keys = OrderedDict()
+        # (family, key) -> (newest bucket at estimate time, count)
+        self._cache = {}
+        self.bytes = 0
+        self.evicted = 0
+
+    def _oldest_bucket(self, now):
+        return int(now // self.bucket_s) - self.window_s // self.bucket_s + 1
+
+    def _prune(self, entry, buckets, oldest):
+        for bucket in [b for b in buckets if b < oldest]:
+            self.bytes -= buckets.pop(bucket).nbytes()
+        if not buckets:
+            del self._keys[entry]
+
+    def _add(self, family, key, value, when, now):
+        bucket = int(when // self.bucket_s)
+        if bucket < self._oldest_bucket(now):
+            return
+        entry = (family, key)
+        buckets = self._keys.get(entry)
+        if buckets is None:
+            buckets = self._keys[entry] = {}
+        else:
+            self._keys.move_to_end(entry)
+        sketch = buckets.get(bucket)
+        if sketch is None:
+            sketch = buckets[bucket] = HyperLogLog()
+            self.bytes += sketch.nbytes()
+        self.bytes += sketch.add(hash64(value))
+        self._cache.pop(entry, None)
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._keys:
+            entry, buckets = self._keys.popitem(last=False)
+            self.bytes -= sum(s.nbytes() for s in buckets.values())
+            self._cache.pop(entry, None)
+            self.evicted += 1
+
+    def add_transaction(self, row, now=None):
+        """Fold one transactions row in directly (no watermark change)"""
+        now = now or time.time()
+        with self._lock:
+            self._add_row(row, now)
+            self._evict()
+
+    def _add_row(self, row, now):
+        when = _epoch(row.get("timestamp"))
+        for family, (key_column, value_column) in FAMILIES.items():
+            key, value = row.get(key_column), row.get(value_column)
+            if key and value:
+                self._add(family, key, value, when, now)
+
+    # ------------------------------
+    # Lookups
+    # ------------------------------
+    def distinct(self, family, key, now=None):
+        """Distinct values for the key over the window (0 for unseen keys)"""
+        self.maybe_catch_up()
+        now = now or time.time()
+        newest = int(now // self.bucket_s)
+        entry = (family, key)
+        with self._lock:
+            buckets = self._keys.get(entry)
+            if buckets is None:
+                return 0
+            self._keys.move_to_end(entry)
+            cached = self._cache.get(entry)
+            if cached is not None and cached[0] == newest:
+                return cached[1]
+            self._prune(entry, buckets, self._oldest_bucket(now))
+            if not buckets:
+                self._cache.pop(entry, None)
+                return 0
+            count = estimate(list(buckets.values()))
+            self._cache[entry] = (newest, count)
+            return count
+
+    def scorer_features(self, from_account, device_id=None):
+        """Fields detect_fraud understands; missing keys contribute nothing"""
+        features = {}
+        if from_account:
+            features["sender_distinct_recipients_24h"] = self.distinct(RECIPIENTS, from_account)
+        if device_id:
+            features["device_distinct_accounts_24h"] = self.distinct(DEVICES, device_id)
+        return features
+
+    # ------------------------------
+    # Folding and snapshots
+    # ------------------------------
+    def _apply(self, rows):
+        now = time.time()
+        for r in rows:
+            self._add_row(r, now)
+        self._evict()
+
+    def _dump(self):
+        return {
+            "precision": PRECISION,
+            "bucket_s": self.bucket_s,
+            "keys": [
+                (entry, [(bucket, s.hashes.tobytes(), None if s.registers is None else s.registers.tobytes())
+                         for bucket, s in buckets.items()])
+                for entry, buckets in self._keys.items()
+            ],
+        }
+
+    def _compatible(self, state):
+        return state.get("precision") == PRECISION and state.get("bucket_s") == self.bucket_s
+
+    def _restore(self, state):
+        oldest = self._oldest_bucket(time.time())
+        for entry, buckets in state["keys"]:
+            restored = {}
+            for bucket, hashes, registers in buckets:
+                if bucket < oldest:
+                    continue
+                sketch = HyperLogLog()
+                sketch.hashes.frombytes(hashes)
+                if registers is not None:
+                    sketch.registers = np.frombuffer(registers, dtype=np.uint8).copy()
+                restored[bucket] = sketch
+                self.bytes += sketch.nbytes()
+            if restored:
+                self._keys[entry] = restored
+        self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted,
+                "watermarks": list(self.watermarks.values()),
+            }